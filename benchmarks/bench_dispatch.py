@@ -0,0 +1,81 @@
+"""请求调度"""
+import pytest
+from django.test import RequestFactory
+from django.urls import path, include
+
+from django_openapi import OpenAPI, Resource, Operation
+from django_openapi.parameters import Query
+from django_openapi.schema import schemas
+
+openapi = OpenAPI()
+
+
+@Resource('/default')
+class DefaultAPI:
+    def __init__(self, request):
+        self.request = request
+
+    def get(self):
+        return 'ok'
+
+
+@Resource('/no-init')
+class NoInitAPI:
+    def get(self):
+        return 'ok'
+
+
+@Resource('/stateless', stateless=True)
+class StatelessAPI:
+    def get(self):
+        return 'ok'
+
+
+@Resource('/parameters/{id}', path_parameters={'id': schemas.Integer()}, stateless=True)
+class ParametersAPI:
+    @Operation(response_schema=schemas.Integer)
+    def get(self, query=Query({'page': schemas.Integer(default=1)})):
+        return query['page']
+
+
+for _api in [DefaultAPI, NoInitAPI, StatelessAPI, ParametersAPI]:
+    openapi.add_resource(_api)
+
+rf = RequestFactory()
+
+
+@pytest.mark.benchmark(group='dispatch trivial endpoint')
+@pytest.mark.parametrize('api', [DefaultAPI, NoInitAPI, StatelessAPI], ids=['default', 'no-init', 'stateless'])
+def bench_dispatch(benchmark, api):
+    view = Resource.checkout(api).as_view()
+    request = rf.get('/')
+    benchmark(view, request)
+
+
+@pytest.mark.benchmark(group='dispatch with parameters')
+def bench_dispatch_parameters(benchmark):
+    view = Resource.checkout(ParametersAPI).as_view()
+    request = rf.get('/', {'page': '2'})
+    assert view(request, id='1').content == b'2'
+    benchmark(view, request, id='1')
+
+
+@pytest.mark.benchmark(group='Resource._view trivial endpoint')
+@pytest.mark.parametrize('api', [DefaultAPI, NoInitAPI, StatelessAPI], ids=['default', 'no-init', 'stateless'])
+def bench_resource_view(benchmark, api):
+    """不含响应渲染，只有调度本身的开销"""
+    resource = Resource.checkout(api)
+    request = rf.get('/')
+    benchmark(resource._view, request)
+
+
+urlpatterns = [path('api/', include(openapi.urls))]
+
+
+@pytest.mark.urls('bench_dispatch')
+@pytest.mark.benchmark(group='end-to-end (django test client)')
+@pytest.mark.parametrize('url', ['/api/stateless', '/api/parameters/1?page=2'], ids=['trivial', 'parameters'])
+def bench_client(benchmark, client, url):
+    """经过 django 的中间件、URL 解析和 Resource 的完整请求"""
+    assert client.get(url).status_code == 200
+    benchmark(client.get, url)
@@ -0,0 +1,21 @@
+"""导入定义了大量 schema、Ref 和 OpenAPI 实例的模块"""
+import pytest
+
+SOURCE = '\n'.join(
+    ['from django_openapi import OpenAPI', 'from django_openapi.schema import schemas', '']
+    + ['''
+class Node{i}(schemas.Model):
+    id = schemas.Integer()
+    parent = schemas.Ref('Node{i}', required=False)
+    children = schemas.List(schemas.Ref('Node{i}'), required=False)
+    sibling = schemas.Ref('Node{j}', required=False)
+'''.format(i=i, j=(i + 1) % 300) for i in range(300)]
+    + ['openapi%d = OpenAPI()' % i for i in range(20)]
+)
+
+CODE = compile(SOURCE, 'bench_api_module.py', 'exec')
+
+
+@pytest.mark.benchmark(group='import API module (300 models, 900 Refs, 20 OpenAPI)')
+def bench_import(benchmark):
+    benchmark(exec, CODE, {'__name__': 'bench_api_module'})
@@ -0,0 +1,36 @@
+"""请求参数解析"""
+import pytest
+from django.test import RequestFactory
+
+from django_openapi.parameters import Query, Header, Style
+from django_openapi.schema import schemas
+
+rf = RequestFactory()
+
+query = Query({
+    'page': schemas.Integer(default=1),
+    'page_size': schemas.Integer(default=20),
+    'ids': schemas.List(schemas.Integer, required=False),
+    'tags': schemas.List(schemas.String, required=False, style=Style(explode=False)),
+    'keyword': schemas.String(required=False),
+})
+
+header = Header({
+    'x-request-id': schemas.String(),
+    'x-tenant': schemas.Integer(),
+})
+
+HEADERS = {'HTTP_X_OTHER_%s' % i: 'value %s' % i for i in range(40)}
+
+
+@pytest.mark.benchmark(group='parameters')
+def bench_query(benchmark):
+    request = rf.get('/', {'page': '2', 'ids': ['1', '2', '3'], 'tags': 'a,b,c', 'keyword': 'k'})
+    assert benchmark(query.parse_request, request)['ids'] == [1, 2, 3]
+
+
+@pytest.mark.benchmark(group='parameters')
+def bench_header(benchmark):
+    """客户端发送了 40 多个请求头，schema 只定义了两个"""
+    request = rf.get('/', HTTP_X_REQUEST_ID='abc', HTTP_X_TENANT='1', **HEADERS)
+    assert benchmark(header.parse_request, request) == {'x-request-id': 'abc', 'x-tenant': 1}
@@ -0,0 +1,99 @@
+"""schemas 序列化/反序列化"""
+import datetime
+
+import pytest
+
+from django_openapi.schema import schemas
+
+
+class Item(schemas.Model):
+    id = schemas.Integer()
+    title = schemas.String()
+    price = schemas.Float()
+    on_sale = schemas.Boolean()
+    created_at = schemas.Datetime()
+    tags = schemas.List(schemas.String)
+
+
+class CompiledItem(Item):
+    class Meta:
+        compiled = True
+
+
+class Owner(schemas.Model):
+    id = schemas.Integer()
+    name = schemas.String()
+
+
+class NestedItem(Item):
+    owner = Owner()
+    related = schemas.List(Item)
+
+
+class CompiledNestedItem(NestedItem):
+    class Meta:
+        compiled = True
+
+
+class Row:
+    def __init__(self, i):
+        self.id = i
+        self.title = 'title %s' % i
+        self.price = i / 100
+        self.on_sale = bool(i % 2)
+        self.created_at = datetime.datetime(2022, 1, 1)
+        self.tags = ['a', 'b']
+
+
+class NestedRow(Row):
+    def __init__(self, i):
+        super().__init__(i)
+        self.owner = {'id': i, 'name': 'owner %s' % i}
+        self.related = [Row(i), Row(i + 1)]
+
+
+ROWS = [Row(i) for i in range(1000)]
+NESTED_ROWS = [NestedRow(i) for i in range(1000)]
+
+
+@pytest.mark.benchmark(group='serialize Model')
+@pytest.mark.parametrize('schema,row', [(Item, Row(1)), (NestedItem, NestedRow(1))], ids=['flat', 'nested'])
+def bench_serialize(benchmark, schema, row):
+    benchmark(schema().serialize, row)
+
+
+@pytest.mark.benchmark(group='serialize List(Model) 1k')
+@pytest.mark.parametrize('schema', [Item, CompiledItem], ids=['interpreted', 'compiled'])
+def bench_serialize_list(benchmark, schema):
+    schema = schemas.List(schema)
+    benchmark(schema.serialize, ROWS)
+
+
+@pytest.mark.benchmark(group='serialize List(Model) 1k nested')
+@pytest.mark.parametrize('schema', [NestedItem, CompiledNestedItem], ids=['interpreted', 'compiled'])
+def bench_serialize_nested_list(benchmark, schema):
+    schema = schemas.List(schema)
+    benchmark(schema.serialize, NESTED_ROWS)
+
+
+@pytest.mark.benchmark(group='serialize List(Model) 100k')
+@pytest.mark.parametrize('schema', [Item, CompiledItem], ids=['interpreted', 'compiled'])
+def bench_serialize_list_100k(benchmark, schema):
+    rows = ROWS * 100
+    schema = schemas.List(schema)
+    benchmark.pedantic(schema.serialize, (rows,), rounds=3)
+
+
+PAYLOAD = {
+    'id': '1',
+    'title': 'title',
+    'price': '1.5',
+    'on_sale': 'true',
+    'created_at': '2022-01-01T00:00:00',
+    'tags': ['a', 'b'],
+}
+
+
+@pytest.mark.benchmark(group='deserialize Model')
+def bench_deserialize(benchmark):
+    benchmark(Item().deserialize, PAYLOAD)
@@ -0,0 +1,53 @@
+"""生成大型 API 的文档"""
+import pytest
+
+from django_openapi import OpenAPI, Resource, Operation
+from django_openapi.parameters import Query, Body
+from django_openapi.schema import schemas
+
+RESOURCES = 500  # 每个资源 4 个 operation，共 2000 个
+
+
+class Item(schemas.Model):
+    id = schemas.Integer()
+    title = schemas.String()
+    tags = schemas.List(schemas.String)
+
+
+def make_openapi():
+    openapi = OpenAPI(title='bench')
+    for i in range(RESOURCES):
+        @Resource('/items%d/{id}' % i, path_parameters={'id': schemas.Integer()}, tags=['tag%d' % (i % 20)])
+        class API:
+            @Operation(summary='get', response_schema=Item)
+            def get(self, query=Query({'page': schemas.Integer(default=1), 'q': schemas.String(required=False)})):
+                pass
+
+            @Operation(summary='put', response_schema=Item)
+            def put(self, body=Body(Item)):
+                pass
+
+            @Operation(summary='patch', response_schema=Item)
+            def patch(self, body=Body(Item)):
+                pass
+
+            @Operation(summary='delete', status_code=204)
+            def delete(self):
+                pass
+
+        openapi.add_resource(API)
+    return openapi
+
+
+@pytest.mark.benchmark(group='get_spec 2000 operations')
+def bench_get_spec(benchmark):
+    openapi = make_openapi()
+    spec = openapi.get_spec()
+    assert len(spec['paths']) == RESOURCES
+    benchmark.pedantic(openapi.get_spec, rounds=5)
+
+
+@pytest.mark.benchmark(group='get_spec 2000 operations')
+def bench_encode_spec(benchmark):
+    openapi = make_openapi()
+    benchmark.pedantic(openapi.encode_spec, rounds=5)
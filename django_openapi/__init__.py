@@ -1,5 +1,36 @@
-from .core import OpenAPI, Resource, Operation
-from .core.respond import Respond
-from .model2schema import model2schema
+import importlib
+import typing
 
 __version__ = '0.1a8'
+
+__all__ = ['OpenAPI', 'Resource', 'Operation', 'Respond', 'model2schema']
+
+# 与子模块同名，需要在导入子模块后绑定为函数，所以直接导入
+from .model2schema import model2schema
+
+# 其他公开的名称在第一次访问时才导入对应的模块（PEP 562），import django_openapi 不会导入 core
+_exports = {
+    'OpenAPI': 'django_openapi.core',
+    'Resource': 'django_openapi.core',
+    'Operation': 'django_openapi.core',
+    'Respond': 'django_openapi.core.respond',
+}
+
+if typing.TYPE_CHECKING:
+    from .core import OpenAPI, Resource, Operation
+    from .core.respond import Respond
+
+
+def __getattr__(name):
+    try:
+        module = _exports[name]
+    except KeyError:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name)) from None
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_exports})
+
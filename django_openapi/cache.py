@@ -0,0 +1,302 @@
+"""Operation 响应缓存"""
+import functools
+import hashlib
+import threading
+import time
+import typing
+from collections import OrderedDict, defaultdict
+from wsgiref.util import is_hop_by_hop
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.db import models
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.http import HttpResponse
+
+from django_openapi import queryset as _queryset
+
+__all__ = ['BaseResponseCache', 'LocalResponseCache', 'DjangoResponseCache', 'invalidate']
+
+
+def _time_ns() -> int:
+    # time.time_ns() 在 Python 3.7 中加入
+    return int(time.time() * 1e9)
+
+
+class CachedResponse(typing.NamedTuple):
+    status_code: int
+    content: bytes
+    content_type: str
+    headers: typing.Tuple[typing.Tuple[str, str], ...] = ()
+    cookies: typing.Tuple[typing.Tuple[str, str, typing.Tuple[typing.Tuple[str, str], ...]], ...] = ()
+
+
+class BaseResponseCache:
+    """
+    缓存渲染后的响应内容，缓存键由解析后的请求参数组成，vary_on_user=True 时区分用户。
+    响应带有 Cache-Control 头，默认为 max-age=timeout。
+    """
+
+    def __init__(self, *, timeout: int = 60, vary_on_user: bool = False, cache_control: str = None):
+        self.timeout = timeout
+        self.vary_on_user = vary_on_user
+        if cache_control is None:
+            cache_control = '%smax-age=%d' % ('private, ' if vary_on_user else '', timeout)
+        self.cache_control = cache_control
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> typing.Optional[CachedResponse]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: CachedResponse):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    # 每个 model 有一个版本号，作为缓存键的一部分，model 数据变化时增加版本号，旧的缓存不再被使用
+
+    def get_versions(self, labels: typing.Sequence[str]) -> list:
+        raise NotImplementedError
+
+    def bump_version(self, label: str):
+        raise NotImplementedError
+
+    async def aget(self, key: str) -> typing.Optional[CachedResponse]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: CachedResponse):
+        self.set(key, value)
+
+    async def aget_versions(self, labels: typing.Sequence[str]) -> list:
+        return self.get_versions(labels)
+
+    @property
+    def stats(self) -> dict:
+        return dict(hits=self.hits, misses=self.misses)
+
+
+class LocalResponseCache(BaseResponseCache):
+    """进程内的 LRU 缓存，超过 maxsize 时淘汰最久未使用的响应"""
+
+    def __init__(self, *, maxsize: int = 1024, **kwargs):
+        super().__init__(**kwargs)
+        self.maxsize = maxsize
+        self._data: typing.OrderedDict[str, typing.Tuple[float, CachedResponse]] = OrderedDict()
+        self._versions: typing.Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_versions(self, labels):
+        return [self._versions.get(label, 0) for label in labels]
+
+    def bump_version(self, label):
+        with self._lock:
+            self._versions[label] = self._versions.get(label, 0) + 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DjangoResponseCache(BaseResponseCache):
+    """使用 django 缓存后端，可以在多个进程间共享"""
+
+    def __init__(self, alias: str = 'default', *, key_prefix: str = 'django_openapi.response', **kwargs):
+        super().__init__(**kwargs)
+        self.alias = alias
+        self.key_prefix = key_prefix
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def _make_key(self, key):
+        return '%s:%s' % (self.key_prefix, key)
+
+    def get(self, key):
+        value = self._cache.get(self._make_key(key))
+        return value and CachedResponse(*value)
+
+    def set(self, key, value):
+        self._cache.set(self._make_key(key), tuple(value), self.timeout)
+
+    async def aget(self, key):
+        cache = self._cache
+        if not hasattr(cache, 'aget'):  # Django 4.0 之前缓存后端没有异步接口
+            return await sync_to_async(self.get)(key)
+        value = await cache.aget(self._make_key(key))
+        return value and CachedResponse(*value)
+
+    async def aset(self, key, value):
+        cache = self._cache
+        if not hasattr(cache, 'aset'):
+            return await sync_to_async(self.set)(key, value)
+        await cache.aset(self._make_key(key), tuple(value), self.timeout)
+
+    def get_versions(self, labels):
+        keys = [self._make_key('version:' + label) for label in labels]
+        versions = self._cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # 版本号被清除后使用新的初始值，避免和旧的版本号相同
+                self._cache.add(key, _time_ns(), None)
+                versions[key] = self._cache.get(key)
+        return [versions[key] for key in keys]
+
+    def bump_version(self, label):
+        key = self._make_key('version:' + label)
+        try:
+            self._cache.incr(key)
+        except ValueError:
+            self._cache.set(key, _time_ns(), None)
+
+    async def aget_versions(self, labels):
+        return await sync_to_async(self.get_versions)(labels)
+
+
+def make_response_cache(value) -> typing.Optional[BaseResponseCache]:
+    """Operation(cache=...) 可以是缓存实例或缓存时间（秒）"""
+    if value is None or isinstance(value, BaseResponseCache):
+        return value
+    if isinstance(value, int) and not isinstance(value, bool):
+        return LocalResponseCache(timeout=value)
+    raise TypeError('cache must be an instance of %s or an int.' % BaseResponseCache.__name__)
+
+
+def _key_part(value):
+    # 分页器等参数解析后返回自身的副本，使用其 current_* 属性
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        return sorted((k, v) for k, v in vars(value).items() if k.startswith('current_'))
+    return value
+
+
+def make_cache_key(prefix: str, request, kwargs: dict, vary_on_user: bool, versions=()) -> str:
+    resolver_match = request.resolver_match
+    parts = [
+        prefix,
+        versions,
+        resolver_match and resolver_match.args,
+        resolver_match and resolver_match.kwargs,
+        [(name, _key_part(value)) for name, value in kwargs.items()],
+    ]
+    if vary_on_user:
+        user = getattr(request, 'user', None)
+        parts.append(user.pk if user is not None and user.is_authenticated else None)
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+# 由 HttpResponse 生成或在返回缓存时重新设置的头
+_UNCACHED_HEADERS = {'content-type', 'content-length', 'cache-control'}
+
+
+def to_cached_response(response, status_code: int) -> typing.Optional[CachedResponse]:
+    """只缓存状态码为 Operation.status_code 的普通响应，保留处理函数设置的头和 cookie"""
+    if response.streaming or response.status_code != status_code:
+        return None
+    headers = tuple((key, value) for key, value in response.items()
+                    if key.lower() not in _UNCACHED_HEADERS and not is_hop_by_hop(key))
+    cookies = tuple((morsel.key, morsel.value, tuple((k, v) for k, v in morsel.items() if v))
+                    for morsel in response.cookies.values())
+    return CachedResponse(status_code, response.content, response['Content-Type'], headers, cookies)
+
+
+def from_cached_response(cached: CachedResponse) -> HttpResponse:
+    response = HttpResponse(cached.content, status=cached.status_code, content_type=cached.content_type)
+    for key, value in cached.headers:
+        response[key] = value
+    for key, value, attrs in cached.cookies:
+        response.cookies[key] = value
+        response.cookies[key].update(attrs)
+    return response
+
+
+def _get_label(model) -> str:
+    # noinspection PyProtectedMember
+    return model._meta.concrete_model._meta.label_lower
+
+
+def collect_models(schema, model=None, seen=None) -> typing.Set[typing.Type[models.Model]]:
+    """
+    响应依赖的 model：model2schema 生成的 Model，以及其嵌套字段通过关系对应的 model
+    """
+    seen = set() if seen is None else seen
+    # noinspection PyProtectedMember
+    nested = _queryset._get_nested_schema(schema)
+    if nested is None or id(nested) in seen:
+        return set()
+    seen.add(id(nested))
+
+    model = nested.__django_model__ or model
+    rv = {model} if model is not None else set()
+    for field in nested.fields:
+        related_model = None
+        if model is not None:
+            # noinspection PyProtectedMember
+            model_field = _queryset._get_model_field(model, field.attr)
+            if model_field is not None and model_field.is_relation:
+                related_model = model_field.related_model
+        rv |= collect_models(field, related_model, seen)
+    return rv
+
+
+_dependents: typing.Dict[str, typing.Set[BaseResponseCache]] = defaultdict(set)
+
+
+def watch(cache: BaseResponseCache, dependencies: typing.Iterable[typing.Type[models.Model]]) -> typing.Tuple[str, ...]:
+    """dependencies 中的 model 数据变化时增加 cache 中对应的版本号，返回版本号的名称"""
+    _connect_signals()
+    labels = sorted({_get_label(model) for model in dependencies})
+    for label in labels:
+        _dependents[label].add(cache)
+    return tuple(labels)
+
+
+def invalidate(model: typing.Type[models.Model]):
+    """
+    使依赖 model 的缓存失效。
+    model 的 post_save、post_delete、m2m_changed 信号会自动调用，QuerySet.update() 等不发送信号的修改需要手动调用。
+    """
+    label = _get_label(model)
+    for cache in list(_dependents.get(label, ())):
+        cache.bump_version(label)
+
+
+def _on_change(sender, **kwargs):
+    invalidate(sender)
+
+
+def _on_m2m_changed(sender, instance, action, model, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate(sender)
+        invalidate(type(instance))
+        invalidate(model)
+
+
+@functools.lru_cache(maxsize=None)
+def _connect_signals():
+    post_save.connect(_on_change, weak=False, dispatch_uid='django_openapi.cache')
+    post_delete.connect(_on_change, weak=False, dispatch_uid='django_openapi.cache')
+    m2m_changed.connect(_on_m2m_changed, weak=False, dispatch_uid='django_openapi.cache')
@@ -0,0 +1,66 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+__all__ = ['BaseJSONCodec', 'JSONCodec', 'OrjsonCodec', 'get_codec']
+
+
+class BaseJSONCodec:
+    """请求体解析和响应渲染使用的 JSON 编解码器"""
+
+    content_type = 'application/json'
+
+    def loads(self, data: bytes):
+        """解码失败时抛出 ValueError 或 TypeError"""
+        raise NotImplementedError
+
+    def dumps(self, obj) -> bytes:
+        raise NotImplementedError
+
+
+class JSONCodec(BaseJSONCodec):
+    """标准库 json，编码方式与 django JsonResponse 相同"""
+
+    def __init__(self, **json_dumps_params):
+        self._encoder = DjangoJSONEncoder(**json_dumps_params)
+
+    def loads(self, data: bytes):
+        return json.loads(data)
+
+    def dumps(self, obj) -> bytes:
+        return self._encoder.encode(obj).encode()
+
+
+class OrjsonCodec(BaseJSONCodec):
+    """
+    orjson 原生编码 datetime、date、time、UUID；
+    Decimal 等 orjson 不支持的类型交给 DjangoJSONEncoder 处理。
+    """
+
+    def __init__(self, option: int = None):
+        if orjson is None:
+            raise ImportError('%s requires the "orjson" package.' % self.__class__.__name__)
+        self._option = orjson.OPT_NON_STR_KEYS if option is None else option
+        self._default = DjangoJSONEncoder().default
+
+    def loads(self, data: bytes):
+        return orjson.loads(data)
+
+    def dumps(self, obj) -> bytes:
+        return orjson.dumps(obj, default=self._default, option=self._option)
+
+
+default_codec = JSONCodec()
+
+
+def get_codec(request) -> BaseJSONCodec:
+    """获取处理当前请求的 OpenAPI 实例所配置的编解码器"""
+    openapi = getattr(request, 'openapi', None)
+    if openapi is None:
+        return default_codec
+    return openapi.codec
@@ -1,25 +1,38 @@
+import asyncio
 import copy
 import functools
+import gc
+import gzip as _gzip
 import hashlib
 import inspect
 import itertools
+import json
+import mmap
 import os
 import re
 import sys
+import threading
 import typing
-import uuid
+import warnings
 from collections import defaultdict
 from http import HTTPStatus
 
 import django.urls
+from asgiref.sync import sync_to_async
+from django.apps import apps
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Model, QuerySet
 from django.http import HttpRequest
-from django.http.response import HttpResponseBase, JsonResponse
+from django.http.response import HttpResponseBase, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
 from django.utils.functional import cached_property
+from django.utils.http import parse_etags
 from django.views.decorators.csrf import csrf_exempt
 
 from . import respond as _respond
 from django_openapi.parameters.parameters import BaseParameter
+from django_openapi.codecs import BaseJSONCodec, default_codec
 from django_openapi.exceptions import NotFound, MethodNotAllowed
 from django_openapi.parameters.style import StyleParser
 from django_openapi.permissions import BasePermission
@@ -28,6 +41,10 @@ from django_openapi.schema.exceptions import ValidationError
 from django_openapi.schema.schemas import BaseSchema
 from django_openapi.utils.functional import make_schema, make_instance, make_model_schema
 from django_openapi.spec import utils as _spec, Tag
+from django_openapi import queryset as _queryset
+from django_openapi import cache as _cache
+from django_openapi import timing as _timing
+from django_openapi import metrics as _metrics
 
 
 class OpenAPI:
@@ -40,8 +57,16 @@ class OpenAPI:
             security: typing.List[typing.Dict[str, typing.List[str]]] = None,
             security_schemes: dict = None,
             respond=_respond.Respond,
+            codec: BaseJSONCodec = None,
+            spec_gzip: bool = False,
+            spec_dir: str = None,
+            server_timing: bool = False,
+            on_timing: typing.Callable[[HttpRequest, HttpResponseBase, _timing.Timing], None] = None,
+            metrics: typing.Union[bool, _metrics.MetricsRegistry] = False,
+            id: str = None,
     ):
-        self._id: str = self.__get_id()
+        # 默认由创建实例的模块和行号生成，文档和统计接口的 URL 中使用前 8 位
+        self._id: str = id or self.__get_id()
         self.title = title
         self._description = _spec.clean_commonmark(description)
         self._version = version
@@ -50,8 +75,45 @@ class OpenAPI:
         self._security_schemas = security_schemes
         self._spec_endpoint = '/apispec_%s' % self.id[:8]
         self._resources: typing.List[Resource] = []
+        self._schemas: typing.List[schemas.Model] = []
         self._append_url(self._spec_endpoint, self.spec_view)
         self.respond = respond
+        self.codec = codec or default_codec
+        self._spec_gzip = spec_gzip
+        self._spec_dir = spec_dir
+        self._encoded_specs: typing.Dict[str, _EncodedSpec] = {}
+        self._spec_lock = threading.Lock()
+        # 记录请求各阶段耗时，未启用时没有额外开销
+        self.server_timing = server_timing
+        self.on_timing = on_timing
+        # 按 Operation 统计请求，通过 metrics_view 以 Prometheus 文本格式输出
+        self.metrics: typing.Optional[_metrics.MetricsRegistry] = (
+            _metrics.MetricsRegistry() if metrics is True else (metrics or None))
+        if self.metrics is not None:
+            self._append_url('/metrics_%s' % self.id[:8], self.metrics_view)
+
+    @property
+    def instrumented(self) -> bool:
+        return self.server_timing or self.on_timing is not None or self.metrics is not None
+
+    def _finish_timing(self, request, response: typing.Optional[HttpResponseBase], timing: _timing.Timing,
+                       resource: 'Resource'):
+        """response 为 None 表示生成响应时出现了未处理的异常"""
+        total = timing.finish()
+        if self.metrics is not None:
+            status_code = 500 if response is None else response.status_code
+            # 请求方法由客户端决定，未定义的方法统一记录为 other，避免标签数量无限增加
+            method = timing.method if timing.method in resource._dispatch_table else 'other'
+            self.metrics.observe(timing.path, method, status_code, total)
+        if response is None:
+            return
+        if self.server_timing:
+            response['Server-Timing'] = timing.to_header()
+        if self.on_timing is not None:
+            self.on_timing(request, response, timing)
+
+    def metrics_view(self, request, **kwargs):
+        return HttpResponse(self.metrics.to_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
     @cached_property
     def id(self):
@@ -59,9 +121,10 @@ class OpenAPI:
 
     @staticmethod
     def __get_id():
+        # 只使用 frame 的 globals 和行号，不读取源文件
         # noinspection PyProtectedMember,PyUnresolvedReferences
-        frame = inspect.getframeinfo(sys._getframe(2))
-        rv = '%s:%s' % (os.path.relpath(frame.filename), frame.lineno)
+        frame = sys._getframe(2)
+        rv = '%s:%s' % (frame.f_globals.get('__name__'), frame.f_lineno)
         return hashlib.md5(rv.encode()).hexdigest()
 
     def add_resource(self, obj):
@@ -73,6 +136,7 @@ class OpenAPI:
         resource.root = self
 
         self._resources.append(resource)
+        self.invalidate_spec()
 
         view = resource.as_view()
         self._append_url(resource.django_path, view)
@@ -86,8 +150,14 @@ class OpenAPI:
         return self._urls
 
     def get_spec(self, request: HttpRequest = None) -> dict:
-        if self._security_schemas:
-            _spec.Collection(self.id).security = [{k: []} for k in self._security_schemas.keys()]
+        security_schemas = self._security_schemas or {}
+        context = _spec.SpecContext(security=[{k: []} for k in security_schemas.keys()])
+
+        for index, schema in enumerate(self._schemas):
+            schema.to_spec(context, need_required_field=True, schema_id=self.__get_registered_schema_id(schema, index))
+
+        paths = {r.openapi_path: r.to_spec(context) for r in self._resources}
+        context.finish()
 
         spec = _spec.clean({
             'openapi': '3.0.3',
@@ -96,16 +166,16 @@ class OpenAPI:
                 'version': self._version,
                 'description': self._description,
             },
-            'paths': _spec.Protect({r.openapi_path: r.to_spec(self.id) for r in self._resources}),
+            'paths': _spec.Protect(paths),
             'components': {
-                'schemas': _spec.Collection(self.id).schemas,
+                'schemas': dict(context.schemas),
                 'securitySchemes': self._security_schemas,
             },
-            'tags': _spec.Collection(self.id).tags.list(),
+            'tags': context.tags,
         })
 
         if request:
-            prefix = request.path[:-len(self._spec_endpoint)]
+            prefix = self._get_server_prefix(request)
             if prefix:
                 spec.update(servers=[{'url': prefix}])
 
@@ -114,14 +184,157 @@ class OpenAPI:
 
         return spec
 
-    def spec_view(self, request):
+    def _get_server_prefix(self, request) -> str:
+        return request.path[:-len(self._spec_endpoint)]
+
+    def encode_spec(self, request: HttpRequest = None, *, minify: bool = None) -> bytes:
+        if minify is None:
+            minify = not settings.DEBUG
+        json_dumps_params = dict(separators=(',', ':')) if minify else dict(indent=2)
         spec = self.get_spec(request)
-        json_dumps_params = dict(indent=2, ensure_ascii=False) if settings.DEBUG else {}
-        return JsonResponse(spec, json_dumps_params=json_dumps_params)
+        return json.dumps(spec, cls=DjangoJSONEncoder, ensure_ascii=False, **json_dumps_params).encode()
+
+    def get_spec_artifact_name(self, server_prefix: str = None) -> str:
+        """openapi_build 命令生成的文档文件名"""
+        return 'openapi-%s-%s.json' % (self.id[:8], hashlib.md5((server_prefix or '').encode()).hexdigest()[:8])
+
+    def _get_encoded_spec(self, request) -> '_EncodedSpec':
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is not None and not _is_static_route(resolver_match.route):
+            # 前缀来自路径参数（例如 <str:tenant>/），每个值都缓存会使缓存无限增长，每次请求时生成
+            return _EncodedSpec(self.encode_spec(request), gzip=self._spec_gzip)
+
+        prefix = self._get_server_prefix(request)
+        encoded = self._encoded_specs.get(prefix)
+        if encoded is None:
+            with self._spec_lock:  # 避免并发请求重复生成
+                encoded = self._encoded_specs.get(prefix)
+                if encoded is None:
+                    if self._spec_dir:
+                        encoded = _EncodedSpec.load(os.path.join(self._spec_dir, self.get_spec_artifact_name(prefix)))
+                    if encoded is None:
+                        encoded = _EncodedSpec(self.encode_spec(request), gzip=self._spec_gzip)
+                    self._encoded_specs[prefix] = encoded
+        return encoded
+
+    def invalidate_spec(self):
+        """清除已缓存的文档，下次请求时重新生成"""
+        self._encoded_specs.clear()
+
+    def warmup(self, *, spec: bool = True, freeze: bool = False):
+        """
+        在服务启动时（例如 gunicorn 的 preload_app）调用，预先完成第一次请求时才会进行的初始化：
+        解析 Ref、组合权限、生成调度表和 schema 的序列化/反序列化计划，以及生成 URLConf 中各个前缀的文档。
+        freeze=True 时调用 gc.freeze()，fork 后的子进程不会因为垃圾回收修改这些对象，可以共享内存（Python 3.7 之前忽略）。
+        """
+        for resource in self._resources:
+            resource.warmup()
+        for schema in self._schemas:
+            schema.warmup()
+
+        if spec:
+            for openapi, route in _iter_spec_views(django.urls.get_resolver().url_patterns):
+                if openapi is not self or not _is_static_route(route):  # 无法确定前缀的路径在请求时生成
+                    continue
+                request = HttpRequest()
+                request.path = '/' + route
+                self._get_encoded_spec(request)
+
+        if freeze and hasattr(gc, 'freeze'):  # Python 3.7+
+            gc.collect()
+            gc.freeze()
+
+    def spec_view(self, request, **kwargs):
+        """文档按服务器前缀生成一次后缓存，使用 ETag 响应条件请求；kwargs 是前缀中的路径参数，只作为服务器前缀的一部分"""
+        encoded = self._get_encoded_spec(request)
+
+        use_gzip = encoded.gzip_content is not None and _accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        # 不同编码的内容不同，使用不同的强 ETag
+        etag = encoded.gzip_etag if use_gzip else encoded.etag
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        etags = parse_etags(if_none_match) if if_none_match else []
+        if '*' in etags or etag in etags:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(encoded.gzip_content if use_gzip else encoded.content,
+                                    content_type='application/json')
+            if use_gzip:
+                response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+        if encoded.gzip_content is not None:
+            patch_vary_headers(response, ['Accept-Encoding'])
+        return response
 
     def register_schema(self, schema):
-        schema = make_model_schema(schema)
-        schema.to_spec(self.id, need_required_field=True, schema_id=uuid.uuid4().hex)
+        self._schemas.append(make_model_schema(schema))
+        self.invalidate_spec()
+
+    @staticmethod
+    def __get_registered_schema_id(schema, index):
+        name = '%s.%s:%s' % (schema.__class__.__module__, schema.__class__.__qualname__, index)
+        return hashlib.md5(name.encode()).hexdigest()
+
+
+def _iter_spec_views(patterns, prefix=''):
+    """遍历 URLConf，找出所有 OpenAPI 的文档视图及其完整路径"""
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, django.urls.URLResolver):
+            yield from _iter_spec_views(pattern.url_patterns, route)
+        elif isinstance(pattern, django.urls.URLPattern):
+            openapi = getattr(pattern.callback, '__self__', None)
+            if isinstance(openapi, OpenAPI) and pattern.callback.__func__ is OpenAPI.spec_view:
+                yield openapi, route
+
+
+def _is_static_route(route: str) -> bool:
+    """不包含路径参数、正则表达式的路径"""
+    return not any(c in route for c in '<^$(')
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Accept-Encoding 中 gzip（或 *）的 q 值大于 0"""
+    qvalues = {}
+    for item in accept_encoding.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[coding.lower()] = q
+    return qvalues.get('gzip', qvalues.get('*', 0.0)) > 0
+
+
+class _EncodedSpec:
+    __slots__ = ('content', 'gzip_content', 'etag', 'gzip_etag')
+
+    def __init__(self, content: typing.Union[bytes, memoryview], *, gzip: bool = False, gzip_content=None):
+        self.content = content
+        self.gzip_content = _gzip.compress(content) if gzip else gzip_content
+        digest = hashlib.sha256(content).hexdigest()
+        self.etag = '"%s"' % digest
+        self.gzip_etag = '"%s-gzip"' % digest
+
+    @classmethod
+    def load(cls, path: str) -> typing.Optional['_EncodedSpec']:
+        """使用内存映射读取 openapi_build 命令生成的文档，文件不存在、为空或无法读取时返回 None"""
+        content = _mmap_file(path)
+        if content is None:
+            return None
+        return cls(content, gzip_content=_mmap_file(path + '.gz'))
+
+
+def _mmap_file(path) -> typing.Optional[memoryview]:
+    try:
+        with open(path, 'rb') as fp:
+            return memoryview(mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ))
+    except (OSError, ValueError):  # 空文件无法映射，抛出 ValueError
+        return None
 
 
 class Resource:
@@ -145,6 +358,7 @@ class Resource:
             permission=None,
             view_decorators: list = None,
             include_in_spec=True,
+            stateless: bool = False,
     ):
         if not path.startswith('/'):
             raise ValueError('The path must start with a "/"')
@@ -156,6 +370,8 @@ class Resource:
         self.root: typing.Optional[OpenAPI] = None
         self.view_decorators = view_decorators or []
         self.include_in_spec = include_in_spec
+        # 无状态资源只实例化一次，所有请求共用同一个实例
+        self.stateless = stateless
         self._parse_path(path)
         self.__view_function = None
 
@@ -163,31 +379,17 @@ class Resource:
         self._path_kwargs_style_parser = StyleParser({key: value.style for key, value in self.path_parameters.items()},
                                                      'path')
 
-    def __get_view_decorators(self):
-        for d in self.view_decorators:
-            yield d
-
-        def operation_decorator(source_decorator, http_method):
-            def decorator(view):
-                @functools.wraps(view)
-                def wrapper(request, *args, **kwargs):
-                    if request.method == http_method:
-                        return source_decorator(view)(request, *args, **kwargs)
-                    return view(request, *args, **kwargs)
-
-                return wrapper
-
-            return decorator
-
-        for method, operation in self.operations.items():
-            for d in operation.view_decorators:
-                yield operation_decorator(d, method.upper())
-
     __marked: typing.Dict[typing.Type, 'Resource'] = {}
 
     def __call__(self, klass):
         if klass in self.__marked:
             raise ValueError('%s has been marked by %s.' % (klass, self.__class__.__name__))
+        if self.stateless:
+            try:
+                inspect.signature(klass).bind()
+            except TypeError:
+                raise ValueError('%s: stateless=True requires a class that can be instantiated without arguments, '
+                                 'its __init__ cannot take the request.' % klass.__qualname__) from None
         self.__marked[klass] = self
         self.__klass = klass
 
@@ -217,53 +419,183 @@ class Resource:
             return None
 
     def _parse_path_parameters(self, kwargs):
-        kwargs = self._path_kwargs_style_parser.parse(kwargs)
+        data = self._path_kwargs_style_parser.parse(kwargs)
         for name, schema in self.path_parameters.items():
-            if name not in kwargs:
+            if name not in data:
                 continue
             try:
-                kwargs[name] = schema.deserialize(kwargs[name])
+                kwargs[name] = schema.deserialize(data[name])
             except ValidationError:
                 raise NotFound
         return kwargs
 
+    @property
+    def is_async(self) -> bool:
+        """存在异步的 Operation 时，as_view() 返回异步视图"""
+        return any(operation.is_async for operation in self.operations.values())
+
     def as_view(self):
         if self.__view_function is None:
-            @csrf_exempt
+            self._dispatch_table  # noqa 注册时生成调度表
+            is_async = self.is_async
+
+            if self.root.instrumented:  # type: ignore
+                view = self.__make_instrumented_view(is_async)
+            elif is_async:
+                async def view(request, *args, **kwargs) -> HttpResponseBase:
+                    request.openapi = self.root
+                    respond = self.root.respond(request)  # type: ignore
+                    try:
+                        rv, status_code = await self._aview(request, *args, **kwargs)
+                    except Exception as exc:
+                        return await respond.ahandle_error(exc)
+                    return await respond.amake_response(rv, status_code)
+            else:
+                def view(request, *args, **kwargs) -> HttpResponseBase:
+                    request.openapi = self.root
+                    respond = self.root.respond(request)  # type: ignore
+                    try:
+                        rv, status_code = self._view(request, *args, **kwargs)
+                    except Exception as exc:
+                        return respond.handle_error(exc)
+                    return respond.make_response(rv, status_code)
+
+            for decorator in self.view_decorators:
+                view = decorator(view)
+
+            # Operation 的视图装饰器在 Resource 的装饰器外层，预先套用到各自 HTTP 方法的视图上，请求时只经过对应方法的装饰器
+            method_views = {}
+            for method, operation in self.operations.items():
+                if operation.view_decorators:
+                    method_view = view
+                    for decorator in operation.view_decorators:
+                        method_view = decorator(method_view)
+                    method_views[method.upper()] = method_view
+
+            if method_views and is_async:
+                async def dispatch(request, *args, **kwargs):
+                    return await method_views.get(request.method, view)(request, *args, **kwargs)
+            elif method_views:
+                def dispatch(request, *args, **kwargs):
+                    return method_views.get(request.method, view)(request, *args, **kwargs)
+            else:
+                dispatch = view
+
+            if asyncio.iscoroutinefunction(dispatch):
+                dispatch.csrf_exempt = True  # django csrf_exempt 的包装函数不是协程函数
+            else:
+                dispatch = csrf_exempt(dispatch)
+            self.__view_function = dispatch
+
+        return self.__view_function
+
+    def __make_instrumented_view(self, is_async):
+        """记录各阶段耗时的视图"""
+        root: OpenAPI = self.root  # type: ignore
+        self._parse_path_parameters = _timing.timed('path', self._parse_path_parameters)
+
+        if is_async:
+            async def view(request, *args, **kwargs) -> HttpResponseBase:
+                request.openapi = root
+                respond = root.respond(request)
+                timing = _timing.Timing(self.openapi_path, request.method)
+                token = _timing.activate(timing)
+                response = None
+                try:
+                    try:
+                        rv, status_code = await self._aview(request, *args, **kwargs)
+                    except Exception as exc:
+                        response = await _timing.timed('respond', respond.ahandle_error)(exc)
+                    else:
+                        response = await _timing.timed('respond', respond.amake_response)(rv, status_code)
+                finally:
+                    _timing.deactivate(token)
+                    root._finish_timing(request, response, timing, self)
+                return response
+        else:
             def view(request, *args, **kwargs) -> HttpResponseBase:
-                respond = self.root.respond(request)  # type: ignore
+                request.openapi = root
+                respond = root.respond(request)
+                timing = _timing.Timing(self.openapi_path, request.method)
+                token = _timing.activate(timing)
+                response = None
                 try:
-                    rv, status_code = self._view(request, *args, **kwargs)
-                except Exception as exc:
-                    return respond.handle_error(exc)
-                return respond.make_response(rv, status_code)
+                    try:
+                        rv, status_code = self._view(request, *args, **kwargs)
+                    except Exception as exc:
+                        response = _timing.timed('respond', respond.handle_error)(exc)
+                    else:
+                        response = _timing.timed('respond', respond.make_response)(rv, status_code)
+                finally:
+                    _timing.deactivate(token)
+                    root._finish_timing(request, response, timing, self)
+                return response
+
+        return view
 
-            for decorator in self.__get_view_decorators():
-                view = decorator(view)
+    @cached_property
+    def _dispatch_table(self) -> typing.Dict[str, typing.Callable]:
+        """HTTP 方法 -> 预先绑定了实例化方式、处理函数和 Operation 的调用函数"""
+        is_async = self.is_async
+        table = {}
+        for method, operation in self.operations.items():
+            dispatcher = self.__make_dispatcher(method, operation)
+            if is_async and not operation.is_async:
+                dispatcher = sync_to_async(dispatcher)
+            table[method.upper()] = dispatcher
+        return table
+
+    def __make_dispatcher(self, method, operation: 'Operation'):
+        klass = self.__klass
+        if type(operation).wrapped_invoke is Operation.wrapped_invoke:
+            invoke = operation.compiled_invoke
+        else:
+            invoke = operation.wrapped_invoke  # 子类重写了 wrapped_invoke
 
-            self.__view_function = view
+        if self.root is not None and self.root.instrumented:
+            compiled_invoke = invoke
 
-        return self.__view_function
+            def invoke(handler, request):
+                return compiled_invoke(_timing.timed('handler', handler), request)
 
-    def _view(self, request, *args, **kwargs) -> typing.Tuple[typing.Any, int]:
-        kwargs = self._parse_path_parameters(kwargs)  # raise path parameter 404
+        if self.stateless:
+            handler = getattr(klass(), method)
 
-        method = request.method.lower()
-        if method in self.HTTP_METHODS and hasattr(self.__klass, method):
-            instance = self.__klass() if self.__klass.__init__ is object.__init__ else self.__klass(request, *args,
-                                                                                                    **kwargs)
-            handler = getattr(instance, method)
+            def dispatcher(request, args, kwargs):
+                return invoke(handler, request)
+        elif klass.__init__ is object.__init__:
+            def dispatcher(request, args, kwargs):
+                return invoke(getattr(klass(), method), request)
         else:
+            def dispatcher(request, args, kwargs):
+                return invoke(getattr(klass(request, *args, **kwargs), method), request)
+
+        return dispatcher
+
+    def warmup(self):
+        self.as_view()
+        for schema in self.path_parameters.values():
+            schema.warmup()
+        for operation in self.operations.values():
+            operation.warmup()
+
+    def _view(self, request, *args, **kwargs) -> typing.Tuple[typing.Any, int]:
+        if self.path_parameters:
+            kwargs = self._parse_path_parameters(kwargs)  # raise path parameter 404
+
+        dispatcher = self._dispatch_table.get(request.method)
+        if dispatcher is None:
             raise MethodNotAllowed  # raise 405
+        return dispatcher(request, args, kwargs)  # raise 401 403 ...
 
-        operation = self.operations[method]
-        return operation.wrapped_invoke(handler, request)  # raise 401 403 ...
+    async def _aview(self, request, *args, **kwargs) -> typing.Tuple[typing.Any, int]:
+        return await self._view(request, *args, **kwargs)
 
     def _parse_path(self, path):
         assert path.startswith('/')
         openapi_path = django_path = path
 
-        path_parameters_spec = []
+        path_parameter_names = []
         pattern = re.compile(r"{(?P<parameter>.*)}")
         for match in pattern.finditer(openapi_path):
             (parameter,) = match.groups()
@@ -273,17 +605,7 @@ class Resource:
             else:
                 schema = schemas.String()
                 self.path_parameters[parameter] = schema
-
-            style, explode = schema.style.get_style_and_explode('path')
-            path_parameters_spec.append({
-                'name': parameter,
-                'in': 'path',
-                'required': True,
-                'description': schema.description,
-                'schema': schema.to_spec(),
-                'style': style,
-                'explode': explode,
-            })
+            path_parameter_names.append(parameter)
 
             if isinstance(schema, schemas.Path):
                 placeholder = '<path:%s>'
@@ -293,14 +615,32 @@ class Resource:
 
         self.django_path = django_path
         self.openapi_path = openapi_path
-        self.path_parameters_spec = path_parameters_spec
+        self._path_parameter_names = path_parameter_names
 
-    def to_spec(self, spec_id):
+    @cached_property
+    def path_parameters_spec(self) -> typing.List[dict]:
+        """第一次生成文档时创建，注册时只解析路由需要的部分"""
+        spec = []
+        for name in self._path_parameter_names:
+            schema = self.path_parameters[name]
+            style, explode = schema.style.get_style_and_explode('path')
+            spec.append({
+                'name': name,
+                'in': 'path',
+                'required': True,
+                'description': schema.description,
+                'schema': schema.to_spec(),
+                'style': style,
+                'explode': explode,
+            })
+        return spec
+
+    def to_spec(self, context):
         if not self.include_in_spec:
             return
         spec = {}
         for method, operation in self.operations.items():
-            spec[method] = _spec.merge({'parameters': self.path_parameters_spec}, operation.to_spec(spec_id))
+            spec[method] = _spec.merge({'parameters': self.path_parameters_spec}, operation.to_spec(context))
         return spec
 
 
@@ -317,10 +657,15 @@ class Operation:
             permission=None,
             status_code: int = 200,
             view_decorators: list = None,
+            stream: bool = False,
+            stream_chunk_size: int = 2000,
+            optimize_queryset: bool = True,
+            cache: typing.Union[_cache.BaseResponseCache, int] = None,
+            cache_depends_on: typing.List[typing.Union[typing.Type[Model], str]] = None,
     ):
         self._tags = tags or []
         self.summary = summary
-        self.description = _spec.clean_commonmark(description)
+        self._description = description
 
         self.response_schema: BaseSchema = response_schema and make_schema(response_schema)
         self.deprecated = deprecated
@@ -336,12 +681,33 @@ class Operation:
         self.parameters: typing.Dict[str, BaseParameter] = {}
         self.view_decorators = view_decorators or []
 
-    def _get_tags(self, spec_id):
+        # 流式响应，逐项序列化 List 的元素
+        if stream and not isinstance(self.response_schema, schemas.List):
+            raise ValueError('stream=True requires a List response_schema.')
+        self.stream = stream
+        self.stream_chunk_size = stream_chunk_size
+
+        # 根据 response_schema 优化处理函数返回的 QuerySet
+        self.optimize_queryset = optimize_queryset
+
+        # 响应缓存，可以是缓存实例或缓存时间（秒）
+        self.cache = _cache.make_response_cache(cache)
+        # 响应依赖的 model，数据变化时缓存失效，默认从 response_schema 和分页器推断
+        self.cache_depends_on = cache_depends_on
+
+        self._is_async_handler = False
+
+    @cached_property
+    def description(self) -> typing.Optional[str]:
+        """只在生成文档时使用，第一次生成文档时处理"""
+        return _spec.clean_commonmark(self._description)
+
+    def _get_tags(self, context):
         tags = []
         for t in itertools.chain(self.resource.tags, self._tags):
             if isinstance(t, Tag):
                 tags.append(t.name)
-                _spec.Collection(spec_id).tags.add(t)
+                context.add_tag(t)
             else:
                 tags.append(t)
         return tags
@@ -379,21 +745,174 @@ class Operation:
 
     def __call__(self, handler):
         self.parse_parameters(handler)
+        self._is_async_handler = asyncio.iscoroutinefunction(handler)
+        if self.stream and self._is_async_handler:
+            # StreamingHttpResponse 在事件循环中迭代，QuerySet 的查询不能在事件循环中执行
+            raise ValueError('stream=True is not supported for async handlers.')
         assert not hasattr(handler, 'operation')
         handler.operation = self
         return handler
 
+    def warmup(self):
+        self.compiled_invoke  # noqa 同时组合权限
+        if self.response_schema is not None:
+            self.response_schema.warmup()
+        for param in self.parameters.values():
+            param.warmup()
+
     def wrapped_invoke(self, handler, request) -> typing.Tuple[typing.Any, int]:
-        # check permission
-        self.permission is not None and self.permission.check_permission(request)  # 401, 403
+        return self.compiled_invoke(handler, request)
 
-        kwargs = self.parse_request(request)
-        rv = handler(**kwargs)
-        if not isinstance(rv, HttpResponseBase) and self.response_schema:
-            rv = self.response_schema.serialize(rv)
-        return rv, self.status_code
+    @property
+    def is_async(self) -> bool:
+        """处理函数或权限检查是协程函数"""
+        return self._is_async_handler or (self.permission is not None and self.permission.is_async)
 
-    def to_spec(self, spec_id):
+    @cached_property
+    def compiled_invoke(self) -> typing.Union[
+        typing.Callable[[typing.Callable, HttpRequest], typing.Tuple[typing.Any, int]],
+        typing.Callable[[typing.Callable, HttpRequest], typing.Awaitable[typing.Tuple[typing.Any, int]]],
+    ]:
+        """预先确定权限、参数和响应序列化方式的 wrapped_invoke，异步 Operation 返回协程函数"""
+        permission = self.permission
+        parsers = tuple((name, param.parse_request) for name, param in self.parameters.items())
+        # 子类重写了 parse_request 时使用重写的方法
+        parse_request = None if type(self).parse_request is Operation.parse_request else self.parse_request
+        serialize = self.response_schema and self.__make_response_serializer()
+        status_code = self.status_code
+        cache = self.cache
+
+        check_permission = permission is not None and permission.check_permission
+        acheck_permission = permission is not None and permission.acheck_permission
+        assert self.resource
+        if self.resource.root is not None and self.resource.root.instrumented:
+            check_permission = check_permission and _timing.timed('permission', check_permission)
+            acheck_permission = acheck_permission and _timing.timed('permission', acheck_permission)
+            parsers = tuple((name, _timing.timed('parameters', parse)) for name, parse in parsers)
+            parse_request = parse_request and _timing.timed('parameters', parse_request)
+            serialize = serialize and _timing.timed('serialize', serialize)
+        cache_key_prefix = cache is not None and self.__get_cache_key_prefix()
+        version_labels = cache is not None and _cache.watch(cache, self.get_cache_dependencies())
+        if cache is not None and not version_labels and self.cache_depends_on is None:
+            warnings.warn(
+                '%s: no model dependencies could be inferred for the response cache, it will only expire by '
+                'timeout. Set cache_depends_on (an empty list if it does not depend on any model).'
+                % self.__get_cache_key_prefix().split(':', 1)[1],
+                RuntimeWarning)
+
+        if self.is_async:
+            handler_is_async = self._is_async_handler
+            async_serialize = serialize and sync_to_async(serialize)
+
+            async def acall(handler, kwargs):
+                if handler_is_async:
+                    rv = await handler(**kwargs)
+                else:
+                    rv = await sync_to_async(handler)(**kwargs)
+                if serialize and not isinstance(rv, HttpResponseBase):
+                    # 返回值中可能有延迟查询的 QuerySet、外键等，查询数据库不能在事件循环中执行
+                    rv = await async_serialize(rv)
+                return rv
+
+            async def ainvoke(handler, request):
+                acheck_permission and await acheck_permission(request)  # 401, 403
+                if parse_request is None:
+                    kwargs = {name: parse(request) for name, parse in parsers}
+                else:
+                    kwargs = parse_request(request)
+                if cache is None:
+                    return await acall(handler, kwargs), status_code
+
+                versions = version_labels and await cache.aget_versions(version_labels)
+                if cache.vary_on_user:  # request.user 是延迟加载的，需要查询 session 和用户
+                    key = await sync_to_async(_cache.make_cache_key)(
+                        cache_key_prefix, request, kwargs, True, versions)
+                else:
+                    key = _cache.make_cache_key(cache_key_prefix, request, kwargs, False, versions)
+                cached = await cache.aget(key)
+                if cached is None:
+                    cache.misses += 1
+                    rv = await acall(handler, kwargs)
+                    response = await request.openapi.respond(request).amake_response(rv, status_code)
+                    cached = _cache.to_cached_response(response, status_code)
+                    cached is not None and await cache.aset(key, cached)
+                else:
+                    cache.hits += 1
+                    response = _cache.from_cached_response(cached)
+                response['Cache-Control'] = cache.cache_control
+                return response, status_code
+
+            return ainvoke
+
+        def call(handler, kwargs):
+            rv = handler(**kwargs)
+            if serialize and not isinstance(rv, HttpResponseBase):
+                rv = serialize(rv)
+            return rv
+
+        def invoke(handler, request):
+            check_permission and check_permission(request)  # 401, 403
+            if parse_request is None:
+                kwargs = {name: parse(request) for name, parse in parsers}
+            else:
+                kwargs = parse_request(request)
+            if cache is None:
+                return call(handler, kwargs), status_code
+
+            # 响应缓存，保存渲染后的内容
+            versions = version_labels and cache.get_versions(version_labels)
+            key = _cache.make_cache_key(cache_key_prefix, request, kwargs, cache.vary_on_user, versions)
+            cached = cache.get(key)
+            if cached is None:
+                cache.misses += 1
+                response = request.openapi.respond(request).make_response(call(handler, kwargs), status_code)
+                cached = _cache.to_cached_response(response, status_code)
+                cached is not None and cache.set(key, cached)
+            else:
+                cache.hits += 1
+                response = _cache.from_cached_response(cached)
+            response['Cache-Control'] = cache.cache_control
+            return response, status_code
+
+        return invoke
+
+    def get_cache_dependencies(self) -> typing.Set[typing.Type[Model]]:
+        if self.cache_depends_on is not None:
+            return {apps.get_model(m) if isinstance(m, str) else m for m in self.cache_depends_on}
+
+        dependencies = _cache.collect_models(self.response_schema) if self.response_schema else set()
+        for param in self.parameters.values():
+            inner_schema = getattr(param, '_inner_schema', None)  # 分页器
+            if inner_schema is not None:
+                dependencies |= _cache.collect_models(inner_schema)
+        return dependencies
+
+    def __get_cache_key_prefix(self):
+        method = next(m for m, o in self.resource.operations.items() if o is self)
+        root = self.resource.root
+        return '%s:%s:%s' % (root and root.id, method, self.resource.openapi_path)
+
+    def __make_response_serializer(self):
+        schema = self.response_schema
+        if not isinstance(schema, schemas.List) or not (self.optimize_queryset or self.stream):
+            return schema.serialize
+
+        # noinspection PyProtectedMember
+        child = schema._child
+        optimize_queryset = self.optimize_queryset
+        stream = self.stream
+        chunk_size = self.stream_chunk_size
+
+        def serialize(rv):
+            if optimize_queryset and isinstance(rv, QuerySet):
+                rv = _queryset.optimize(rv, child)
+            if stream and rv is not None:
+                return _respond.JsonStream(rv, child.serialize, chunk_size)
+            return schema.serialize(rv)
+
+        return serialize
+
+    def to_spec(self, context):
         if not self.include_in_spec:
             return
 
@@ -401,19 +920,22 @@ class Operation:
             {
                 'summary': self.summary,
                 'description': self.description,
-                'tags': self._get_tags(spec_id),
+                'tags': self._get_tags(context),
                 'deprecated': _spec.default_as_none(self.deprecated, False),
                 'responses': {
                     self.status_code: {
                         'description': self.response_description,
+                        'headers': {
+                            'Cache-Control': {'schema': {'type': 'string', 'example': self.cache.cache_control}},
+                        } if self.cache is not None else None,
                         'content': {
                             'application/json': {
-                                'schema': self.response_schema and self.response_schema.to_spec(spec_id)
+                                'schema': self.response_schema and self.response_schema.to_spec(context)
                             }
                         }
                     },
                 },
-                'security': self.permission and _spec.Skip(self.permission.to_spec, spec_id)
+                'security': self.permission and _spec.Skip(self.permission.to_spec, context)
             },
-            *(x.to_spec(spec_id) for x in self.parameters.values())
+            *(x.to_spec(context) for x in self.parameters.values())
         ])
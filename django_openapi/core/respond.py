@@ -1,8 +1,64 @@
-from django.http.response import HttpResponseBase, HttpResponse, JsonResponse
+import itertools
+
+import django
+from django.db.models import QuerySet, prefetch_related_objects
+from django.http.response import HttpResponseBase, HttpResponse, StreamingHttpResponse
 
 from django_openapi import exceptions
+from django_openapi.codecs import get_codec
+
+__all__ = ['Respond', 'JsonStream']
+
+
+class JsonStream:
+    """
+    Operation(stream=True) 的返回值，encode 时逐项序列化并输出一个 JSON 数组。
+    QuerySet 通过 .iterator(chunk_size=...) 读取，内存占用与数据量无关。
+    """
+
+    def __init__(self, items, serialize, chunk_size: int):
+        self.items = items
+        self.serialize = serialize
+        self.chunk_size = chunk_size
+
+    def encode(self, dumps):
+        items = self.items
+        if isinstance(items, QuerySet):
+            # noinspection PyProtectedMember
+            if items._prefetch_related_lookups and not _ITERATOR_PREFETCH:
+                items = _iterator_with_prefetch(items, self.chunk_size)
+            else:
+                items = items.iterator(chunk_size=self.chunk_size)
+
+        serialize = self.serialize
+        chunk = [b'[']
+        sep = b''
+        for index, item in enumerate(items, 1):
+            chunk.append(sep)
+            chunk.append(dumps(serialize(item)))
+            sep = b','
+            if index % self.chunk_size == 0:
+                yield b''.join(chunk)
+                chunk = []
+        chunk.append(b']')
+        yield b''.join(chunk)
+
 
-__all__ = ['Respond']
+# Django 4.1 开始 QuerySet.iterator(chunk_size=...) 会按块执行 prefetch_related
+_ITERATOR_PREFETCH = django.VERSION >= (4, 1)
+
+
+def _iterator_with_prefetch(queryset: QuerySet, chunk_size: int):
+    """Django 4.1 之前 iterator() 忽略 prefetch_related，按块读取后手动预取"""
+    # noinspection PyProtectedMember
+    lookups = queryset._prefetch_related_lookups
+    iterator = queryset.prefetch_related(None).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        prefetch_related_objects(chunk, *lookups)
+        yield from chunk
 
 
 class BaseRespond:
@@ -12,6 +68,14 @@ class BaseRespond:
     def handle_error(self, e: Exception):
         raise NotImplementedError
 
+    # 异步视图调用以下方法，默认使用同步实现，需要 IO 时可以重写为异步方法
+
+    async def amake_response(self, rv, status_code: int) -> HttpResponseBase:
+        return self.make_response(rv, status_code)
+
+    async def ahandle_error(self, e: Exception) -> HttpResponseBase:
+        return self.handle_error(e)
+
 
 class Respond(BaseRespond):
     def __init__(self, request):
@@ -21,20 +85,25 @@ class Respond(BaseRespond):
         if isinstance(rv, HttpResponseBase):
             return rv
 
+        codec = get_codec(self.request)
+
+        if isinstance(rv, JsonStream):
+            return StreamingHttpResponse(rv.encode(codec.dumps), status=status_code, content_type=codec.content_type)
+
         if rv is None:
             rv = b''
         if isinstance(rv, (str, bytes)):
             return HttpResponse(rv, status=status_code)
 
-        return JsonResponse(rv, status=status_code)
+        return HttpResponse(codec.dumps(rv), status=status_code, content_type=codec.content_type)
 
     def handle_error(self, e: Exception) -> HttpResponseBase:
         def make_response(status_code):
             content = e.args[0] if e.args else b''
-            return Respond.make_response(..., content, status_code)
+            return Respond.make_response(self, content, status_code)
 
         if isinstance(e, exceptions.RequestArgsError):
-            return JsonResponse({'errors': e.errors}, status=400)
+            return Respond.make_response(self, {'errors': e.errors}, 400)
 
         if isinstance(e, exceptions.BadRequest):
             return make_response(400)
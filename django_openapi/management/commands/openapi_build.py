@@ -0,0 +1,36 @@
+import gzip
+import os
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import get_resolver
+
+from django_openapi.core import _iter_spec_views, _is_static_route
+
+
+class Command(BaseCommand):
+    help = '预先生成 OpenAPI 文档，配合 OpenAPI(spec_dir=...) 使用，服务启动后无需再生成文档。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='文档输出目录')
+        parser.add_argument('--no-gzip', action='store_true', help='不生成 gzip 压缩文件')
+        parser.add_argument('--urlconf', help='默认使用 settings.ROOT_URLCONF')
+
+    def handle(self, *args, output_dir, no_gzip, urlconf, **options):
+        os.makedirs(output_dir, exist_ok=True)
+        factory = RequestFactory()
+
+        for openapi, route in _iter_spec_views(get_resolver(urlconf).url_patterns):
+            if not _is_static_route(route):  # 路径参数或正则无法确定前缀
+                self.stderr.write('Skipped dynamic route: %s' % route)
+                continue
+
+            request = factory.get('/' + route)
+            content = openapi.encode_spec(request, minify=True)
+            path = os.path.join(output_dir, openapi.get_spec_artifact_name(openapi._get_server_prefix(request)))
+            with open(path, 'wb') as fp:
+                fp.write(content)
+            if not no_gzip:
+                with open(path + '.gz', 'wb') as fp:
+                    fp.write(gzip.compress(content))
+            self.stdout.write(path)
@@ -0,0 +1,141 @@
+"""按 Operation 统计请求数、耗时和错误，以 Prometheus 文本格式输出"""
+import bisect
+import threading
+import typing
+import weakref
+
+__all__ = ['MetricsRegistry']
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Series:
+    __slots__ = ('buckets', 'sum', 'statuses')
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size  # 最后一个是 +Inf
+        self.sum = 0.0
+        self.statuses: typing.Dict[int, int] = {}
+
+    def merge(self, other: '_Series'):
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.sum += other.sum
+        for status, count in list(other.statuses.items()):
+            self.statuses[status] = self.statuses.get(status, 0) + count
+
+
+class _ShardHolder:
+    """保存在线程局部变量中，线程结束时被回收，触发分片的合并"""
+    __slots__ = ('shard', '__weakref__')
+
+    def __init__(self, shard):
+        self.shard = shard
+
+
+class MetricsRegistry:
+    """
+    每个线程写入自己的分片，记录时不需要加锁，输出时合并所有分片。
+    只有创建分片、合并分片时使用锁。线程结束后其分片合并到共享的 _base 中，线程数量不会使分片无限增加。
+    """
+
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS, *, namespace: str = 'django_openapi'):
+        self.buckets = tuple(sorted(buckets))
+        self.namespace = namespace
+        self._shards: typing.List[typing.Dict[typing.Tuple[str, str], _Series]] = []
+        self._base: typing.Dict[typing.Tuple[str, str], _Series] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _get_shard(self) -> typing.Dict[typing.Tuple[str, str], _Series]:
+        try:
+            return self._local.holder.shard
+        except AttributeError:
+            shard: typing.Dict[typing.Tuple[str, str], _Series] = {}
+            holder = self._local.holder = _ShardHolder(shard)
+            with self._lock:
+                self._shards.append(shard)
+            weakref.finalize(holder, self._retire_shard, shard)
+            return shard
+
+    def _retire_shard(self, shard):
+        with self._lock:
+            self._merge_into(self._base, shard)
+            self._shards = [s for s in self._shards if s is not shard]
+
+    def _merge_into(self, target: dict, shard: dict):
+        for key, series in list(shard.items()):
+            item = target.get(key)
+            if item is None:
+                item = target[key] = _Series(len(self.buckets) + 1)
+            item.merge(series)
+
+    def observe(self, path: str, method: str, status_code: int, duration: float):
+        shard = self._get_shard()
+        series = shard.get((path, method))
+        if series is None:
+            series = shard[(path, method)] = _Series(len(self.buckets) + 1)
+        series.buckets[bisect.bisect_left(self.buckets, duration)] += 1
+        series.sum += duration
+        series.statuses[status_code] = series.statuses.get(status_code, 0) + 1
+
+    def collect(self) -> typing.Dict[typing.Tuple[str, str], dict]:
+        """合并所有分片，{(path, method): {'buckets': [...], 'sum': float, 'count': int, 'statuses': {...}}}"""
+        merged: typing.Dict[typing.Tuple[str, str], _Series] = {}
+        with self._lock:
+            shards = list(self._shards)
+            self._merge_into(merged, self._base)
+        for shard in shards:
+            self._merge_into(merged, shard)
+        return {
+            key: dict(buckets=series.buckets, sum=series.sum, statuses=series.statuses, count=sum(series.buckets))
+            for key, series in merged.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self._base.clear()
+            for shard in self._shards:
+                shard.clear()
+
+    def to_prometheus(self) -> str:
+        ns = self.namespace
+        data = sorted(self.collect().items())
+        lines = [
+            '# HELP %s_requests_total Total requests by operation and response status.' % ns,
+            '# TYPE %s_requests_total counter' % ns,
+        ]
+        for (path, method), item in data:
+            for status, count in sorted(item['statuses'].items()):
+                lines.append('%s_requests_total{%s,status="%s"} %d' % (ns, _labels(path, method), status, count))
+
+        lines += [
+            '# HELP %s_errors_total Error responses (status >= 400) by operation and response status.' % ns,
+            '# TYPE %s_errors_total counter' % ns,
+        ]
+        for (path, method), item in data:
+            for status, count in sorted(item['statuses'].items()):
+                if status >= 400:
+                    lines.append('%s_errors_total{%s,status="%s"} %d' % (ns, _labels(path, method), status, count))
+
+        lines += [
+            '# HELP %s_request_duration_seconds Request latency by operation.' % ns,
+            '# TYPE %s_request_duration_seconds histogram' % ns,
+        ]
+        for (path, method), item in data:
+            labels = _labels(path, method)
+            cumulative = 0
+            for bound, count in zip((*map(repr, self.buckets), '+Inf'), item['buckets']):
+                cumulative += count
+                lines.append('%s_request_duration_seconds_bucket{%s,le="%s"} %d' % (ns, labels, bound, cumulative))
+            lines.append('%s_request_duration_seconds_sum{%s} %r' % (ns, labels, item['sum']))
+            lines.append('%s_request_duration_seconds_count{%s} %d' % (ns, labels, item['count']))
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(path, method) -> str:
+    return 'path="%s",method="%s"' % (_escape(path), _escape(method))
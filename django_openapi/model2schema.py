@@ -14,9 +14,9 @@ try:
 except ImportError:
     JSONField = None
 
-from django_openapi.utils.functional import Filter
 from django_openapi.schema import schemas
 from django_openapi.schema.exceptions import ValidationError
+from django_openapi.utils.functional import Filter
 
 __all__ = ['model2schema']
 
@@ -188,7 +188,23 @@ def model2schema(
         exclude_fields=None,
         extra_kwargs: typing.Dict[str, typing.Dict[str, typing.Any]] = None,
 ) -> typing.Type[schemas.Model]:
-    extra_kwargs = extra_kwargs or {}
+    """
+    相同的参数返回同一个类，不会重复转换。
+    extra_kwargs 中有不可哈希的值（例如 list）时每次生成新的类。
+    """
+    include_fields = include_fields if include_fields is None else tuple(include_fields)
+    exclude_fields = exclude_fields if exclude_fields is None else tuple(exclude_fields)
+    extra = tuple(sorted((name, tuple(sorted(kwargs.items()))) for name, kwargs in (extra_kwargs or {}).items()))
+    try:
+        hash(extra)
+    except TypeError:
+        return _model2schema.__wrapped__(model, include_fields, exclude_fields, extra)
+    return _model2schema(model, include_fields, exclude_fields, extra)  # type: ignore[arg-type]
+
+
+@functools.lru_cache(maxsize=1024)
+def _model2schema(model, include_fields, exclude_fields, extra) -> typing.Type[schemas.Model]:
+    extra_kwargs = {name: dict(kwargs) for name, kwargs in extra}
 
     fields = {}
     filter_ = Filter(include_fields, exclude_fields)
@@ -210,4 +226,6 @@ def model2schema(
     if extra_kwargs:
         raise ValueError('Redundant extra_kwargs keys: %s.' % ', '.join(extra_kwargs.keys()))
 
-    return schemas.Model.from_dict(fields)
+    schema = schemas.Model.from_dict(fields)
+    schema.__django_model__ = model  # 用于推断响应缓存依赖的 model
+    return schema
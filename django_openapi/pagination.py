@@ -1,53 +1,93 @@
 import copy
+import datetime
+import hashlib
 import inspect
+import json
 
 import typing
-from django.db import models
-from django.db.models import QuerySet
+from django.core import signing
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models
+from django.db.models import QuerySet, Q
 from django.http import HttpRequest
 from django.utils.functional import cached_property
 
 from django_openapi import model2schema
+from django_openapi.exceptions import RequestArgsError
 from django_openapi.parameters.parameters import BaseParameter, Query
+from django_openapi.queryset import optimize
 from django_openapi.schema import schemas
+from django_openapi.schema.exceptions import ValidationError
 from django_openapi.utils.functional import make_instance
 
 
 class PageNumberPaginator(BaseParameter):
+    """
+    count_strategy 决定如何获取总数：
+    - exact: 每次请求执行 COUNT 查询
+    - none: 不获取总数，多查询一行用于判断 has_more，响应中使用 has_more 代替 count
+    - estimated: 使用 estimate_count() 获取估算值
+    - cached: 按查询语句和参数缓存 COUNT 结果 count_cache_timeout 秒
+    """
+
     __limit__ = 1
 
+    COUNT_STRATEGIES = ('exact', 'none', 'estimated', 'cached')
+
     page: schemas.Integer = schemas.Integer(gte=1, default=1)
     page_size: typing.Union[schemas.Integer, int] = schemas.Integer(gte=1, lte=1000, default=20)
 
     field_mapping: typing.Dict[str, str] = {}
 
-    def __init__(self, schema):
+    count_strategy: str = 'exact'
+    count_cache_alias: str = 'default'
+    count_cache_timeout: int = 60
+
+    def __init__(self, schema, *, count_strategy: str = None):
         if inspect.isclass(schema) and issubclass(schema, models.Model):
             schema = model2schema(schema)
         self._inner_schema = make_instance(schema)
+        if count_strategy is not None:
+            self.count_strategy = count_strategy
+        if self.count_strategy not in self.COUNT_STRATEGIES:
+            raise ValueError('count_strategy must be one of %s.' % ', '.join(map(repr, self.COUNT_STRATEGIES)))
         self._query = Query(dict(
             page=self._response_schema.fields.page,
             page_size=isinstance(self.page_size, schemas.BaseSchema) and self._response_schema.fields.page_size,
         ))
-        self.current_page = None
-        self.current_page_size = None
+        self.current_page: typing.Optional[int] = None
+        self.current_page_size: typing.Optional[int] = None
+        self.optimize_queryset = True
 
     def setup(self, operation):
+        self.optimize_queryset = operation.optimize_queryset
         if operation.response_schema is None:
             operation.response_schema = self._response_schema()
 
     @cached_property
     def _response_schema(self):
+        if self.count_strategy == 'none':
+            total = dict(has_more=schemas.Boolean(alias=self.field_mapping.get('has_more')))
+        else:
+            total = dict(count=schemas.Integer(
+                alias=self.field_mapping.get('count'),
+                description='估算的总数' if self.count_strategy == 'estimated' else None,
+            ))
         return schemas.Model.from_dict(dict(
-            count=schemas.Integer(alias=self.field_mapping.get('count')),
+            **total,
             page=self.page.copy_with(alias=self.field_mapping.get('page')),
             page_size=(self.page_size if isinstance(self.page_size, schemas.Integer) else schemas.Integer()).copy_with(
                 alias=self.field_mapping.get('page_size')),
             results=schemas.List(self._inner_schema, alias=self.field_mapping.get('results'))
         ))
 
-    def to_spec(self, spec_id):
-        return self._query.to_spec(spec_id)
+    def to_spec(self, context):
+        return self._query.to_spec(context)
+
+    def warmup(self):
+        self._query.warmup()
+        self._inner_schema.warmup()
 
     def parse_request(self, request: HttpRequest):
         args = self._query.parse_request(request)
@@ -58,17 +98,223 @@ class PageNumberPaginator(BaseParameter):
 
         return this
 
+    def get_count(self, queryset: QuerySet) -> int:
+        if self.count_strategy == 'estimated':
+            return self.estimate_count(queryset)
+        if self.count_strategy == 'cached':
+            return self._get_cached_count(queryset)
+        return queryset.count()
+
+    def estimate_count(self, queryset: QuerySet) -> int:
+        """
+        估算总数，可以在子类中重写。
+        默认在 PostgreSQL 中使用查询计划的估算行数，其他数据库执行 COUNT 查询。
+        """
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return queryset.count()
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']['Plan Rows']
+
+    def _get_cached_count(self, queryset: QuerySet) -> int:
+        sql, params = queryset.query.sql_with_params()
+        key = 'django_openapi.count:%s' % hashlib.md5(('%s:%s:%r' % (queryset.db, sql, params)).encode()).hexdigest()
+        return caches[self.count_cache_alias].get_or_set(key, queryset.count, self.count_cache_timeout)
+
     def paginate(self, queryset: typing.Union[QuerySet, typing.Sequence]):
-        offset = (self.current_page - 1) * self.current_page_size
+        page, page_size = self.current_page, self.current_page_size
+        assert page is not None and page_size is not None, 'paginate() must be called after parse_request().'
+        offset = (page - 1) * page_size
+        rv: typing.Dict[str, typing.Any] = dict(page=page, page_size=page_size)
 
         if isinstance(queryset, QuerySet):
-            count = queryset.count()
+            if self.count_strategy != 'none':
+                rv['count'] = self.get_count(queryset)
+            if self.optimize_queryset:
+                queryset = optimize(queryset, self._inner_schema)
+        elif self.count_strategy != 'none':
+            rv['count'] = len(queryset)
+
+        if self.count_strategy == 'none':
+            results = list(queryset[offset: offset + page_size + 1])
+            rv['has_more'] = len(results) > page_size
+            rv['results'] = results[:page_size]
+        else:
+            rv['results'] = queryset[offset: offset + page_size]
+        return rv
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder 会将 datetime、time 截断到毫秒，游标需要保留完整的值"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class _CursorSerializer:
+    """游标中的值可能是 datetime、Decimal 等，编码为字符串后可直接用于 QuerySet 过滤"""
+
+    def dumps(self, obj):
+        return json.dumps(obj, cls=_CursorEncoder, separators=(',', ':')).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+
+class _Cursor(typing.NamedTuple):
+    position: list  # 上一页边界行的排序字段值
+    reverse: bool  # 向前翻页
+
+
+class _CursorSchema(schemas.String):
+    salt = 'django_openapi.pagination.CursorPaginator'
+
+    def _deserialize(self, value):
+        value = super()._deserialize(value)
+        try:
+            position, reverse = signing.loads(value, salt=self.salt, serializer=_CursorSerializer)
+        except (signing.BadSignature, TypeError, ValueError):
+            raise ValidationError('invalid cursor.')
+        return _Cursor(position, reverse)
+
+    @classmethod
+    def encode(cls, cursor: _Cursor) -> str:
+        return signing.dumps(list(cursor), salt=cls.salt, serializer=_CursorSerializer)
+
+
+class CursorPaginator(BaseParameter):
+    """
+    游标分页，按 ordering（最后会补充主键保证顺序稳定）使用 WHERE 条件定位，不使用 OFFSET 和 COUNT 查询。
+    ordering 的字段应该有索引且不为 NULL，游标经过签名，客户端不能修改。
+    """
+
+    __limit__ = 1
+
+    ordering: typing.Sequence[str] = ('-pk',)
+    page_size: typing.Union[schemas.Integer, int] = schemas.Integer(gte=1, lte=1000, default=20)
+
+    field_mapping: typing.Dict[str, str] = {}
+
+    def __init__(self, schema, *, ordering: typing.Sequence[str] = None):
+        if inspect.isclass(schema) and issubclass(schema, models.Model):
+            schema = model2schema(schema)
+        self._inner_schema = make_instance(schema)
+        if ordering is not None:
+            self.ordering = ordering
+        self._query = Query(dict(
+            cursor=_CursorSchema(required=False, alias=self.field_mapping.get('cursor')),
+            page_size=isinstance(self.page_size, schemas.BaseSchema) and self.page_size.copy_with(
+                alias=self.field_mapping.get('page_size')),
+        ))
+        self.current_cursor: typing.Optional[_Cursor] = None
+        self.current_page_size: typing.Optional[int] = None
+        self.optimize_queryset = True
+
+    def setup(self, operation):
+        self.optimize_queryset = operation.optimize_queryset
+        if operation.response_schema is None:
+            operation.response_schema = self._response_schema()
+
+    @cached_property
+    def _response_schema(self):
+        return schemas.Model.from_dict(dict(
+            next=schemas.String(nullable=True, alias=self.field_mapping.get('next')),
+            previous=schemas.String(nullable=True, alias=self.field_mapping.get('previous')),
+            results=schemas.List(self._inner_schema, alias=self.field_mapping.get('results'))
+        ))
+
+    def to_spec(self, context):
+        return self._query.to_spec(context)
+
+    def warmup(self):
+        self._query.warmup()
+        self._inner_schema.warmup()
+
+    def parse_request(self, request: HttpRequest):
+        args = self._query.parse_request(request)
+
+        this = copy.copy(self)
+        this.current_cursor = args.get('cursor')
+        this.current_page_size = args.get('page_size', self.page_size)
+
+        return this
+
+    def _get_ordering(self, model) -> typing.List[typing.Tuple[models.Field, bool]]:
+        """[(字段, 是否降序)]，最后一个字段是主键"""
+        # noinspection PyProtectedMember
+        opts = model._meta
+        ordering = []
+        for item in self.ordering:
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            field = opts.pk if name == 'pk' else opts.get_field(name)
+            if not field.concrete or field.many_to_many:
+                raise ValueError('%s ordering %r is not a concrete field.' % (self.__class__.__name__, item))
+            ordering.append((field, descending))
+            if field.primary_key:
+                break
+        else:
+            ordering.append((opts.pk, ordering[-1][1] if ordering else False))
+        return ordering
+
+    @staticmethod
+    def _get_keyset_filter(ordering, position, reverse) -> Q:
+        """(a, b) 在 position 之后：a > va OR (a = va AND b > vb)"""
+        q = Q()
+        for index in reversed(range(len(ordering))):
+            field, descending = ordering[index]
+            lookup = '%s__%s' % (field.attname, 'lt' if descending ^ reverse else 'gt')
+            condition = Q(**{lookup: position[index]})
+            if index < len(ordering) - 1:
+                condition |= Q(**{field.attname: position[index]}) & q
+            q = condition
+        return q
+
+    def paginate(self, queryset: QuerySet):
+        if not isinstance(queryset, QuerySet):
+            raise TypeError('%s only supports QuerySet.' % self.__class__.__name__)
+        page_size = self.current_page_size
+        assert page_size is not None, 'paginate() must be called after parse_request().'
+
+        ordering = self._get_ordering(queryset.model)
+        cursor = self.current_cursor
+        if cursor is not None and len(cursor.position) != len(ordering):
+            raise RequestArgsError({self._query.schema.fields.cursor.alias: ['invalid cursor.']})
+        reverse = cursor is not None and cursor.reverse
+
+        queryset = queryset.order_by(*[('-' if descending ^ reverse else '') + field.attname
+                                       for field, descending in ordering])
+        if cursor is not None:
+            queryset = queryset.filter(self._get_keyset_filter(ordering, cursor.position, reverse))
+        if self.optimize_queryset:
+            queryset = optimize(queryset, self._inner_schema)
+            names, defer = queryset.query.deferred_loading
+            if names and not defer:  # 使用了 .only()，需要加载排序字段用于生成游标
+                queryset = queryset.only(*names, *(field.name for field, _ in ordering))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        del rows[page_size:]
+        if reverse:
+            rows.reverse()
+
+        def make_cursor(row, backward):
+            return _CursorSchema.encode(_Cursor([field.value_from_object(row) for field, _ in ordering], backward))
+
+        if reverse:
+            has_next, has_previous = cursor is not None, has_more
         else:
-            count = len(queryset)
+            has_next, has_previous = has_more, cursor is not None
 
         return dict(
-            page=self.current_page,
-            page_size=self.current_page_size,
-            results=queryset[offset: offset + self.current_page_size],
-            count=count,
+            next=make_cursor(rows[-1], False) if rows and has_next else None,
+            previous=make_cursor(rows[0], True) if rows and has_previous else None,
+            results=rows,
         )
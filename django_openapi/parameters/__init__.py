@@ -1,14 +1,29 @@
 import typing as _t
 
-from .parameters import (
-    Query as _Query,
-    Cookie as _Cookie,
-    Header as _Header,
-    Body as _Body,
-)
 from .style import Style
 
-Query = _t.cast(_t.Any, _Query)
-Cookie = _t.cast(_t.Any, _Cookie)
-Header = _t.cast(_t.Any, _Header)
-Body = _t.cast(_t.Any, _Body)
+# schemas 导入了 style，parameters 导入了 schemas，在第一次访问时才导入 parameters 避免循环导入
+_exports = ('Query', 'Cookie', 'Header', 'Body')
+
+if _t.TYPE_CHECKING:
+    from .parameters import (
+        Query as _Query,
+        Cookie as _Cookie,
+        Header as _Header,
+        Body as _Body,
+    )
+
+    Query = _t.cast(_t.Any, _Query)
+    Cookie = _t.cast(_t.Any, _Cookie)
+    Header = _t.cast(_t.Any, _Header)
+    Body = _t.cast(_t.Any, _Body)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    from . import parameters
+
+    value = getattr(parameters, name)
+    globals()[name] = value
+    return value
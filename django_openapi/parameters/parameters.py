@@ -1,11 +1,11 @@
 import contextlib
-import json
 import typing
 from abc import ABC
 
 from django.http import HttpRequest
 from django.utils.datastructures import MultiValueDict
 
+from django_openapi.codecs import get_codec
 from django_openapi.parameters.style import StyleParser
 from django_openapi.spec.utils import default_as_none, format_examples
 from django_openapi.exceptions import BadRequest, UnsupportedMediaType, RequestArgsError
@@ -23,9 +23,13 @@ class BaseParameter:
     def parse_request(self, request: HttpRequest):
         raise NotImplementedError
 
-    def to_spec(self, spec_id):
+    def to_spec(self, context):
         raise NotImplementedError
 
+    def warmup(self):
+        """预先完成第一次请求时才会进行的初始化，由 OpenAPI.warmup() 调用"""
+        pass
+
 
 class BaseRequestParameter(BaseParameter, ABC):
     def parse_request(self, request: HttpRequest):
@@ -45,7 +49,10 @@ class RequestParameter(BaseRequestParameter, ABC):
         self.schema = make_model_schema(schema)
         self.parser = StyleParser({f.alias: f.style for f in self.schema.fields}, self.location)
 
-    def to_spec(self, spec_id):
+    def warmup(self):
+        self.schema.warmup()
+
+    def to_spec(self, context):
         spec = []
         for field in self.schema.fields:
             field: schemas.BaseSchema
@@ -55,7 +62,7 @@ class RequestParameter(BaseRequestParameter, ABC):
                 'in': self.location,
                 'required': default_as_none(field.required, False),
                 'description': field.description,
-                'schema': field.to_spec(spec_id),
+                'schema': field.to_spec(context),
                 'style': style,
                 'explode': explode,
                 'allowEmptyValue': default_as_none(field.allow_blank, False),
@@ -113,8 +120,11 @@ class Body(BaseRequestParameter):
                 'The content_type currently supports only %s.' % ', '.join(
                     '%r' % item for item in supported_content_types))
 
-    def to_spec(self, spec_id):
-        schema_spec = self.schema.to_spec(spec_id, need_required_field=True)
+    def warmup(self):
+        self.schema.warmup()
+
+    def to_spec(self, context):
+        schema_spec = self.schema.to_spec(context, need_required_field=True)
 
         media_type = dict(
             schema=schema_spec,
@@ -134,8 +144,8 @@ class Body(BaseRequestParameter):
 
         if request.content_type == 'application/json':
             try:
-                data = json.loads(request.body)
-            except (json.JSONDecodeError, TypeError):
+                data = get_codec(request).loads(request.body)
+            except (ValueError, TypeError):
                 raise BadRequest
         else:
             # with _like_post_request(request) as request:
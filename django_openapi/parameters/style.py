@@ -69,7 +69,7 @@ def space_split(*args):
 
 
 class StyleParser:
-    GETTERS = {
+    GETTERS: typing.Dict[typing.Tuple[str, bool, str, str], typing.Callable[..., typing.Any]] = {
         (Style.FORM, True, 'array', 'query'): getlist,
         (Style.FORM, False, 'array', 'query'): comma_split,
         (Style.FORM, True, 'primitive', 'query'): getitem,
@@ -82,7 +82,7 @@ class StyleParser:
     }
 
     def __init__(self, styles: typing.Dict[str, Style], location):
-        self.key_to_getter = {}
+        self.key_to_getter: typing.Dict[str, typing.Callable[..., typing.Any]] = {}
         for key, s in styles.items():
             style, explode = s.get_style_and_explode(location)
             try:
@@ -92,10 +92,34 @@ class StyleParser:
                     style, explode, s.type, location))
             self.key_to_getter[key] = getter
 
-    def parse(self, data) -> dict:
+    def parse(self, data) -> 'StyleView':
         assert isinstance(data, Mapping), data
-        copy_data = dict(data)
-        for key, getter in self.key_to_getter.items():
-            if key in data:
-                copy_data[key] = getter(data, key)  # type: ignore
-        return copy_data
+        return StyleView(data, self.key_to_getter)
+
+
+class StyleView(Mapping):
+    """
+    StyleParser.parse 的结果，不复制原数据（QueryDict、HttpHeaders 等），
+    只在读取 schema 定义的 key 时使用对应的 getter 取值。
+    """
+
+    __slots__ = ('_data', '_getters', '_default_getter')
+
+    def __init__(self, data: Mapping, getters: typing.Mapping[str, typing.Callable[..., typing.Any]]):
+        self._data = data
+        self._getters = getters
+        # 未定义的 key 按原始数据取值，QueryDict 返回全部值的列表，和 dict(data) 一致
+        self._default_getter = dict.__getitem__ if isinstance(data, dict) else getitem
+
+    def __getitem__(self, key):
+        getter = self._getters.get(key, self._default_getter)
+        return getter(self._data, key)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
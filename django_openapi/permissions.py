@@ -1,8 +1,9 @@
+import asyncio
 import typing
 
+from asgiref.sync import sync_to_async
 from django.http import HttpRequest
 
-from django_openapi.spec import utils as _spec
 from django_openapi.exceptions import Forbidden, Unauthorized
 from django_openapi.utils.functional import make_instance
 
@@ -23,12 +24,24 @@ class BasePermission(_OperationMixin, metaclass=_OperationMixinMeta):
     security: typing.Optional[list] = None
 
     def check_permission(self, request):
+        """可以定义为 async def，此时使用该权限的视图为异步视图"""
         raise NotImplementedError
 
-    def to_spec(self, spec_id):
+    @property
+    def is_async(self) -> bool:
+        return asyncio.iscoroutinefunction(self.check_permission)
+
+    async def acheck_permission(self, request):
+        """异步视图中检查权限，同步的 check_permission（可能查询数据库）在线程中执行"""
+        if self.is_async:
+            await self.check_permission(request)
+        else:
+            await sync_to_async(self.check_permission)(request)
+
+    def to_spec(self, context):
         if self.security is not None:
             return self.security
-        return _spec.Collection(spec_id).security or [{'_$unknown$_': []}]
+        return context.security or [{'_$unknown$_': []}]
 
 
 class _AndOperation(BasePermission):
@@ -36,16 +49,28 @@ class _AndOperation(BasePermission):
         self.p1 = make_instance(p1)
         self.p2 = make_instance(p2)
 
+    @property
+    def is_async(self) -> bool:
+        return self.p1.is_async or self.p2.is_async
+
     def check_permission(self, request):
         self.p1.check_permission(request)
         self.p2.check_permission(request)
 
+    async def acheck_permission(self, request):
+        await self.p1.acheck_permission(request)
+        await self.p2.acheck_permission(request)
+
 
 class _OrOperation(BasePermission):
     def __init__(self, p1, p2):
         self.p1 = make_instance(p1)
         self.p2 = make_instance(p2)
 
+    @property
+    def is_async(self) -> bool:
+        return self.p1.is_async or self.p2.is_async
+
     def check_permission(self, request):
         errors = []
         for p in (self.p1, self.p2):
@@ -57,6 +82,17 @@ class _OrOperation(BasePermission):
                 return
         raise errors[-1]
 
+    async def acheck_permission(self, request):
+        errors = []
+        for p in (self.p1, self.p2):
+            try:
+                await p.acheck_permission(request)
+            except Exception as e:
+                errors.append(e)
+            else:
+                return
+        raise errors[-1]
+
 
 class BaseDjangoUserAuth(BasePermission):
     def has_permission(self, request: HttpRequest):
@@ -0,0 +1,182 @@
+"""根据响应 schema 优化 QuerySet"""
+import functools
+import logging
+import typing
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models.query import ModelIterable
+
+from django_openapi.schema import schemas
+
+__all__ = ['optimize', 'project', 'explain']
+
+logger = logging.getLogger(__name__)
+
+
+class _Plan(typing.NamedTuple):
+    only: typing.Optional[typing.Tuple[str, ...]]  # None 表示 schema 需要整个对象，不能使用 .only()
+    unresolved: typing.Tuple[str, ...]  # 无法对应到 model 字段的 attr，可能是 QuerySet 注解
+    select_related: typing.Tuple[str, ...]
+    prefetch_related: typing.Tuple[str, ...]
+
+
+def _get_model_field(model: typing.Type[models.Model], attr: str):
+    """通过 attr 查找 model 字段，反向关系使用 accessor 名称"""
+    # noinspection PyProtectedMember
+    opts = model._meta
+    for rel in opts.related_objects:
+        if rel.get_accessor_name() == attr:
+            return rel
+    try:
+        field = opts.get_field(attr)
+    except FieldDoesNotExist:
+        return None
+    if field.auto_created and not field.concrete:
+        return None  # 反向关系的查询名称，并不是 model 实例的属性
+    return field
+
+
+def _get_nested_schema(schema) -> typing.Optional[schemas.Model]:
+    """字段是 Model 或 List(Model) 时返回嵌套的 Model"""
+    if isinstance(schema, schemas.Ref):
+        schema = schema.ref
+    if isinstance(schema, schemas.List):
+        # noinspection PyProtectedMember
+        schema = schema._child
+        if isinstance(schema, schemas.Ref):
+            schema = schema.ref
+    if isinstance(schema, schemas.Model):
+        return schema
+    return None
+
+
+def _build_plan(schema: schemas.Model, model, prefix: str, in_prefetch: bool, seen: frozenset) -> _Plan:
+    # noinspection PyProtectedMember
+    only: typing.List[str] = [prefix + model._meta.pk.name]
+    unresolved = []
+    select_related = []
+    prefetch_related = []
+
+    for field in schema.fields:
+        if field.write_only:
+            continue
+
+        model_field = _get_model_field(model, field.attr)
+        if model_field is None or (model_field.is_relation and model_field.related_model is None):
+            # GenericForeignKey 没有确定的关联 model
+            unresolved.append(field.attr)
+            continue
+
+        nested = _get_nested_schema(field)
+        related_model = model_field.related_model
+        key = (related_model, type(nested))
+        if not model_field.is_relation or nested is None or key in seen:
+            if model_field.concrete and not model_field.many_to_many:
+                only.append(prefix + model_field.name)
+            continue
+
+        lookup = prefix + field.attr
+        if in_prefetch or model_field.many_to_many or model_field.one_to_many:
+            # 预取的对象不在当前查询中，其下的关系也只能继续预取
+            sub = _build_plan(nested, related_model, lookup + '__', True, seen | {key})
+            prefetch_related.append(lookup)
+            prefetch_related.extend(sub.select_related + sub.prefetch_related)
+            if model_field.concrete and not model_field.many_to_many:
+                only.append(prefix + model_field.name)
+            continue
+
+        sub = _build_plan(nested, related_model, lookup + '__', False, seen | {key})
+        select_related.append(lookup)
+        select_related.extend(sub.select_related)
+        prefetch_related.extend(sub.prefetch_related)
+        if sub.only is None or sub.unresolved:
+            only.append(lookup)  # 加载关联对象的全部字段
+        else:
+            only.extend(sub.only)
+
+    projectable = schema.fallback is None and not hasattr(schema, 'serialize_preprocess')
+
+    return _Plan(
+        only=tuple(dict.fromkeys(only)) if projectable else None,
+        unresolved=tuple(unresolved),
+        select_related=tuple(select_related),
+        prefetch_related=tuple(prefetch_related),
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_plan(schema: schemas.Model, model: typing.Type[models.Model]) -> _Plan:
+    return _build_plan(schema, model, '', False, frozenset({(model, type(schema))}))
+
+
+def _is_optimizable(queryset: models.QuerySet) -> bool:
+    # noinspection PyProtectedMember
+    return (
+            queryset._result_cache is None
+            and queryset._iterable_class is ModelIterable
+            and not queryset.query.combinator
+            and queryset.query.deferred_loading == (frozenset(), True)  # 已有的 .only()、.defer() 可能和 select_related 冲突
+    )
+
+
+def _project(queryset: models.QuerySet, plan: _Plan) -> models.QuerySet:
+    query = queryset.query
+    if (
+            plan.only is None
+            or query.deferred_loading != (frozenset(), True)
+            or any(attr not in query.annotations and attr not in query.extra for attr in plan.unresolved)
+    ):
+        return queryset
+    return queryset.only(*plan.only)
+
+
+def project(queryset: models.QuerySet, schema) -> models.QuerySet:
+    """
+    对 QuerySet 使用 .only()，只查询 schema 序列化需要的字段。
+    schema 使用了 model 字段以外的属性、或 QuerySet 已经指定了查询字段时不做处理。
+    """
+    if not isinstance(schema, schemas.Model) or not _is_optimizable(queryset) or queryset.query.select_related:
+        return queryset
+    return _project(queryset, _get_plan(schema, queryset.model))
+
+
+def optimize(queryset: models.QuerySet, schema) -> models.QuerySet:
+    """
+    根据 schema 中嵌套的 Model、List(Model) 字段对 QuerySet 使用 select_related、prefetch_related，
+    避免序列化时逐行查询关联对象，再使用 project。
+    """
+    if not isinstance(schema, schemas.Model) or not _is_optimizable(queryset):
+        return queryset
+
+    plan = _get_plan(schema, queryset.model)
+    projectable = not queryset.query.select_related  # 已有的 select_related 可能和 .only() 冲突
+
+    if plan.select_related:
+        queryset = queryset.select_related(*plan.select_related)
+
+    # noinspection PyProtectedMember
+    prefetched = {getattr(lookup, 'prefetch_to', lookup) for lookup in queryset._prefetch_related_lookups}
+    prefetch_related = [lookup for lookup in plan.prefetch_related if lookup not in prefetched]
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+
+    if projectable:
+        queryset = _project(queryset, plan)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Optimized %s queryset for %s: %s', queryset.model.__name__, schema.__class__.__name__,
+                     explain(schema, queryset.model))
+    return queryset
+
+
+def explain(schema, model: typing.Type[models.Model]) -> dict:
+    """返回 optimize 会对 model 的 QuerySet 使用的 only、select_related、prefetch_related，用于调试"""
+    if not isinstance(schema, schemas.Model):
+        return {}
+    plan = _get_plan(schema, model)  # type: ignore[arg-type]
+    return dict(
+        only=None if plan.only is None else list(plan.only),
+        select_related=list(plan.select_related),
+        prefetch_related=list(plan.prefetch_related),
+    )
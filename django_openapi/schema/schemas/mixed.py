@@ -56,6 +56,14 @@ class MixedBase(BaseSchema):
     def _mixed_deserialize(self, value):
         raise NotImplementedError
 
+    def warmup(self):
+        super().warmup()
+        for schema in self.schemas:
+            schema.warmup()
+        if self.discriminator:
+            for schema in self.discriminator.mapping.values():
+                schema.warmup()
+
 
 class OneOf(MixedBase):
 
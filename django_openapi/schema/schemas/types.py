@@ -1,16 +1,16 @@
 import sys
-import copy
 import datetime
+import functools
 import hashlib
 import inspect
 import itertools
+import operator
 import typing
-from collections.abc import Iterable
+from collections.abc import Iterable, Mapping
 
-from dateutil.parser import isoparse
 from django.conf import settings
 from django.utils import timezone
-from django.utils.functional import SimpleLazyObject
+from django.utils.functional import SimpleLazyObject, cached_property
 
 from django_openapi.parameters.style import Style
 from django_openapi.schema import validators as _validators
@@ -25,6 +25,7 @@ _INHERITABLE_METADATA: dict = dict(
     data_format=None,
     default_validators=[],
     unknown_fields='exclude',
+    compiled=False,
 )
 _NON_INHERITED_METADATA = dict(
     register_as_component=True,
@@ -164,13 +165,14 @@ class BaseSchema(metaclass=_SchemaMeta):
 
         value = self._deserialize(value)
 
-        error = ValidationError()
-        for validator in itertools.chain(self._metadata['default_validators'], self._validators):
+        error = None
+        for validator in self._validator_chain:
             try:
                 validator(value)
             except ValidationError as exc:
+                error = error or ValidationError()
                 error.concat(exc)
-        if error.nonempty:
+        if error is not None:
             raise error
 
         if hasattr(self, 'deserialize_postprocess'):
@@ -178,6 +180,10 @@ class BaseSchema(metaclass=_SchemaMeta):
 
         return value
 
+    @cached_property
+    def _validator_chain(self) -> typing.Tuple[typing.Callable[[typing.Any], None], ...]:
+        return tuple(itertools.chain(self._metadata['default_validators'], self._validators))
+
     def _deserialize(self, value):
         raise NotImplementedError
 
@@ -204,6 +210,32 @@ class BaseSchema(metaclass=_SchemaMeta):
     def _serialize(self, value):
         raise NotImplementedError
 
+    def _make_serializer(self) -> typing.Callable[[typing.Any], typing.Any]:
+        """返回与 serialize 等价的函数，各个钩子是否存在提前确定"""
+        if (
+                type(self).serialize is not BaseSchema.serialize
+                or self.fallback
+                or hasattr(self, 'serialize_preprocess')
+                or hasattr(self, 'serialize_postprocess')
+        ):
+            return self.serialize
+
+        _serialize = self._serialize
+        nullable = self.nullable
+
+        def serialize(value):
+            if value is None:
+                if nullable:
+                    return value
+                raise ValueError('The value cannot be None')
+            return _serialize(value)
+
+        return serialize
+
+    def warmup(self):
+        """预先完成第一次请求时才会进行的初始化，由 OpenAPI.warmup() 调用"""
+        self._validator_chain  # noqa
+
     def copy_with(self, **kwargs):
         _args = self.__args
         _kwargs = self.__kwargs.copy()
@@ -276,8 +308,36 @@ EXCLUDE = 'exclude'
 ERROR = 'error'
 
 
+class _DeserializePlan:
+    """Model 实例的反序列化计划，字段是否必需、alias、attr、默认值等提前解析好"""
+    __slots__ = ('fields', 'aliases', 'unknown_fields')
+
+    def __init__(self, model: 'Model', check_required: typing.Callable[[BaseSchema], bool]):
+        fields = []
+        for field in model.fields:
+            if field.read_only:
+                continue
+            default = field.default
+            fields.append((
+                field.alias,
+                field.attr,
+                field.deserialize,
+                check_required(field),
+                field.allow_blank,
+                default,
+                default is not EMPTY and callable(default),
+            ))
+        self.fields = tuple(fields)
+        self.aliases = {f[0]: f[1] for f in fields}  # alias -> attr
+        self.unknown_fields = model._unknown_fields
+
+
 class Model(BaseSchema, metaclass=_ModelMeta):
     fields: _ModelFields
+    # Meta.compiled = True 时生成的序列化函数，只保存在生成它的类上
+    _compiled_serializer: typing.ClassVar[typing.Optional[typing.Callable[[typing.Any], dict]]] = None
+    # model2schema 生成的类对应的 Django model，用于推断响应缓存依赖的 model
+    __django_model__: typing.ClassVar[typing.Optional[type]] = None
 
     class Meta:
         data_type = 'object'
@@ -305,56 +365,73 @@ class Model(BaseSchema, metaclass=_ModelMeta):
             return field.name in self.__required_fields
         return field.required
 
+    @cached_property
+    def _deserialize_plan(self) -> '_DeserializePlan':
+        return _DeserializePlan(self, self.__check_required)
+
+    def warmup(self):
+        if '_deserialize_plan' in self.__dict__:  # 已经完成，通过 Ref 循环引用时在这里结束
+            return
+        super().warmup()
+        self._deserialize_plan  # noqa
+        if self._metadata['compiled']:
+            self._get_compiled_serializer()
+        for field in self.fields:
+            field.warmup()
+
     def _deserialize(self, obj: dict):
-        obj = copy.copy(obj)
+        plan = self._deserialize_plan
 
         data = {}
-        error = ValidationError()
-
-        for field in self.fields:
-            if field.read_only:
-                continue
+        error = None
+        matched = 0
 
-            if field.alias in obj:
-                value = obj[field.alias]
-                del obj[field.alias]
+        for alias, attr, deserialize, required, allow_blank, default, default_is_factory in plan.fields:
+            if alias in obj:
+                value = obj[alias]
+                matched += 1
             else:
                 value = EMPTY
 
             if (
                     value is EMPTY
             ) or (
-                    not field.allow_blank and value == ''
+                    not allow_blank and value == ''
             ):
                 # required
-                if self.__check_required(field):
+                if required:
                     msg = '字段不能为空' if value is not EMPTY else '这个字段是必需的'
-                    error.setitem(field.alias, ValidationError(msg))
+                    error = error or ValidationError()
+                    error.setitem(alias, ValidationError(msg))
 
                 # default
-                if field.default is not EMPTY:
-                    data[field.attr] = field.default() if callable(field.default) else field.default
+                if default is not EMPTY:
+                    data[attr] = default() if default_is_factory else default
 
                 continue
 
             try:
-                data[field.attr] = field.deserialize(value)
+                data[attr] = deserialize(value)
             except ValidationError as exc:
-                error.setitem(field.alias, exc)
+                error = error or ValidationError()
+                error.setitem(alias, exc)
 
-        if self._unknown_fields == EXCLUDE:
-            pass
-        elif self._unknown_fields == INCLUDE:
-            data.update(obj)
-        elif self._unknown_fields == ERROR and obj:
-            [error.setitem(k, ValidationError('unknown field.')) for k in obj]
+        if matched < len(obj):  # 存在未知字段
+            if plan.unknown_fields == INCLUDE:
+                data.update((k, obj[k]) for k in obj if k not in plan.aliases)
+            elif plan.unknown_fields == ERROR:
+                error = error or ValidationError()
+                [error.setitem(k, ValidationError('unknown field.')) for k in obj if k not in plan.aliases]
 
-        if error.nonempty:
+        if error is not None:
             raise error
 
         return data
 
     def _serialize(self, obj):
+        if self._metadata['compiled']:
+            return self._get_compiled_serializer()(obj)
+
         getter = Getter(obj)
         values = {}
         for field in self.fields:
@@ -379,17 +456,62 @@ class Model(BaseSchema, metaclass=_ModelMeta):
                     '%s field %r serialization error: %s' % (self.__class__.__name__, field.attr, repr(e))) from e
         return values
 
+    @classmethod
+    def _get_compiled_serializer(cls) -> typing.Callable[[typing.Any], dict]:
+        """
+        Meta.compiled = True 时使用，每个 Model 类第一次序列化时生成一个专用的序列化函数，
+        字段的 attr、alias、序列化函数、fallback 都提前解析好，结果与非编译模式一致。
+        """
+        compiled = cls.__dict__.get('_compiled_serializer')
+        if compiled is not None:
+            return compiled
+
+        plan = tuple(
+            (field.attr, field.alias, field._make_serializer(), field.fallback)
+            for field in cls.fields
+            if not field.write_only
+        )
+        classname = cls.__name__
+        getter_exceptions = Getter.EXCEPTIONS
+
+        def serializer(obj):
+            get = operator.getitem if isinstance(obj, Mapping) else getattr
+            values = {}
+            for attr, alias, serialize, fallback in plan:
+                try:
+                    value = get(obj, attr)
+                except getter_exceptions:
+                    if fallback:
+                        value = fallback(EMPTY)
+                        if value is EMPTY:
+                            continue
+                    else:
+                        raise
+
+                try:
+                    values[alias] = serialize(value)
+                except Exception as e:
+                    raise ValueError(
+                        '%s field %r serialization error: %s' % (classname, attr, repr(e))) from e
+            return values
+
+        cls._compiled_serializer = serializer
+        return serializer
+
     @classmethod
     def from_dict(cls, fields: typing.Dict[str, BaseSchema], *, meta: dict = None) -> typing.Type['Model']:
+        """
+        相同的 cls、字段（同一个字段对象）和 meta 返回同一个类，不会重复生成。
+        meta 中有不可哈希的值时每次生成新的类。
+        """
         # 过滤掉非 Schema 字段
-        attrs: dict = {k: v for k, v in fields.items() if isinstance(v, BaseSchema)}
-
-        metadata = {k: v for k, v in cls._metadata.items() if k in _INHERITABLE_METADATA}
-        metadata.update(register_as_component=False)
-        meta and metadata.update(meta)
-        attrs['Meta'] = type('Meta', (), metadata)
-
-        return typing.cast(typing.Type[Model], type('GeneratedSchema', (Model,), attrs))
+        items = tuple((k, v) for k, v in fields.items() if isinstance(v, BaseSchema))
+        meta_items = tuple(sorted(meta.items())) if meta else ()
+        try:
+            hash(meta_items)
+        except TypeError:
+            return _generate_model.__wrapped__(cls, items, meta_items)
+        return _generate_model(cls, items, meta_items)
 
     @classmethod
     def partial(
@@ -411,12 +533,12 @@ class Model(BaseSchema, metaclass=_ModelMeta):
                 required.append(field.alias)
         return required
 
-    def to_spec(self, spec_id, *, need_required_field=False, schema_id=None):
+    def to_spec(self, context: '_spec.SpecContext', *, need_required_field=False, schema_id=None):
         spec = super().to_spec()
         properties = {}
+        field: BaseSchema
         for field in self.fields:
-            field: BaseSchema
-            properties[field.alias] = field.to_spec(spec_id, need_required_field=need_required_field)
+            properties[field.alias] = field.to_spec(context, need_required_field=need_required_field)
 
         __doc__ = _spec.clean_commonmark(self.__class__.__doc__)
 
@@ -445,7 +567,7 @@ class Model(BaseSchema, metaclass=_ModelMeta):
                 composite and [spec.pop(k) for k in composite]
 
             # 注册到 openapi components
-            _spec.Collection(spec_id).schemas[schema_id] = spec
+            context.add_schema(schema_id, spec)
 
             # 返回 Schema 引用
             ref = {'$ref': '#/components/schemas/%s' % schema_id}
@@ -457,6 +579,21 @@ class Model(BaseSchema, metaclass=_ModelMeta):
         return spec
 
 
+@functools.lru_cache(maxsize=1024)
+def _generate_model(cls, items: tuple, meta_items: tuple) -> typing.Type[Model]:
+    attrs: dict = dict(items)
+
+    metadata = {k: v for k, v in cls._metadata.items() if k in _INHERITABLE_METADATA}
+    metadata.update(register_as_component=False)
+    metadata.update(meta_items)
+    attrs['Meta'] = type('Meta', (), metadata)
+
+    schema = typing.cast(typing.Type[Model], type('GeneratedSchema', (Model,), attrs))
+    if cls.__django_model__ is not None:  # model2schema 生成的类
+        schema.__django_model__ = cls.__django_model__
+    return schema
+
+
 class String(BaseSchema):
     class Meta:
         data_type = 'string'
@@ -620,15 +757,16 @@ class List(BaseSchema):
             raise ValidationError('不是一个可迭代对象')
 
         rv = []
-        error = ValidationError()
+        error = None
 
         for index, item in enumerate(obj):
             try:
                 rv.append(self._child.deserialize(item))
             except ValidationError as exc:
+                error = error or ValidationError()
                 error.setitem(index, exc)
 
-        if error.nonempty:
+        if error is not None:
             raise error
         return rv
 
@@ -638,10 +776,14 @@ class List(BaseSchema):
             rv.append(self._child.serialize(item))
         return rv
 
-    def to_spec(self, spec_id=None, *args, **kwargs):
+    def warmup(self):
+        super().warmup()
+        self._child.warmup()
+
+    def to_spec(self, context=None, *args, **kwargs):
         spec = super().to_spec()
         spec.update(
-            items=self._child.to_spec(spec_id, *args, **kwargs),
+            items=self._child.to_spec(context, *args, **kwargs),
             maxItems=self.max_items,
             minItems=self.min_items,
             uniqueItems=_spec.default_as_none(self.unique_items, False),
@@ -677,6 +819,11 @@ class Dict(BaseSchema):
     def _serialize(self, obj):
         return {self.key_schema.serialize(key): self.value_schema.serialize(val) for key, val in obj.items()}
 
+    def warmup(self):
+        super().warmup()
+        self.key_schema.warmup()
+        self.value_schema.warmup()
+
     def to_spec(self, *args, **kwargs) -> dict:
         spec = super().to_spec(*args, **kwargs)
         spec.update(
@@ -698,6 +845,8 @@ class Date(BaseSchema):
     def _strptime(self, date_string) -> datetime.datetime:
         if self._dfmt is not None:
             return datetime.datetime.strptime(date_string, self._dfmt)
+        from dateutil.parser import isoparse  # 只在使用 ISO 格式解析时导入
+
         return isoparse(date_string)
 
     def _deserialize(self, date_string) -> datetime.date:
@@ -794,16 +943,16 @@ class Path(String):
 # noinspection PyAbstractClass
 class Ref(BaseSchema):
     def __init__(self, ref: str, **kwargs):
-        module = self.__get_called_module()
+        module_name = self.__get_called_module_name()
         self.ref: BaseSchema = SimpleLazyObject(  # type: ignore
-            lambda: import_string(ref, default_module=module.__name__)(**kwargs))
+            lambda: import_string(ref, default_module=module_name)(**kwargs))
         super().__init__(**kwargs)
 
     @staticmethod
-    def __get_called_module():
+    def __get_called_module_name():
+        # 使用 frame 的 globals，inspect.getmodule 会遍历 sys.modules
         # noinspection PyUnresolvedReferences,PyProtectedMember
-        frame = sys._getframe(2)
-        return inspect.getmodule(frame)
+        return sys._getframe(2).f_globals.get('__name__')
 
     def serialize(self, value):
         return self.ref.serialize(value)
@@ -811,5 +960,9 @@ class Ref(BaseSchema):
     def deserialize(self, value):
         return self.ref.deserialize(value)
 
+    def warmup(self):
+        super().warmup()
+        self.ref.warmup()  # 解析引用
+
     class Meta:
         data_type = 'object'
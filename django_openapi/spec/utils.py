@@ -4,40 +4,51 @@ https://spec.openapis.org/oas/v3.0.3
 import inspect
 import itertools
 import typing
+from types import MappingProxyType
 
 from django_openapi import spec
 
 
-class Collection:
-    _instances: typing.Dict[str, 'Collection'] = {}
-    security: list
-    schemas: dict
+class SpecContext:
+    """
+    一次文档生成的上下文，收集生成过程中注册的 components、tags。
+    每次生成文档都使用新的上下文，finish() 之后不可再修改，所以可以并发生成文档。
+    """
 
-    class _TagsCollection:
-        def __init__(self):
-            self._tags: typing.Dict[str, 'spec.Tag'] = {}
+    def __init__(self, security: typing.List[typing.Dict[str, typing.List[str]]] = None):
+        self._schemas: typing.Dict[str, dict] = {}
+        self._tags: typing.Dict[str, 'spec.Tag'] = {}
+        self._security = security or []
+        self._finished = False
 
-        def add(self, tag: 'spec.Tag'):
-            if tag.name in self._tags and self._tags[tag.name] != tag:
-                raise ValueError('The tag %s already exists.' % tag)
-            self._tags[tag.name] = tag
+    def _check_not_finished(self):
+        if self._finished:
+            raise RuntimeError('The %s has been finished.' % self.__class__.__name__)
 
-        def list(self) -> typing.List[dict]:
-            return list(self._tags.values())
+    def add_schema(self, schema_id: str, schema: dict):
+        self._check_not_finished()
+        self._schemas[schema_id] = schema
 
-    tags: _TagsCollection
+    def add_tag(self, tag: 'spec.Tag'):
+        self._check_not_finished()
+        if tag.name in self._tags and self._tags[tag.name] != tag:
+            raise ValueError('The tag %s already exists.' % tag)
+        self._tags[tag.name] = tag
 
-    def __new__(cls, spec_id: str):
-        assert isinstance(spec_id, str)
-        if spec_id not in cls._instances:
-            self = super().__new__(cls)
-            cls._instances[spec_id] = self
+    def finish(self):
+        self._finished = True
 
-            self.schemas = {}
-            self.security = []
-            self.tags = cls._TagsCollection()
+    @property
+    def schemas(self) -> typing.Mapping[str, dict]:
+        return MappingProxyType(self._schemas)
 
-        return cls._instances[spec_id]
+    @property
+    def tags(self) -> typing.List['spec.Tag']:
+        return list(self._tags.values())
+
+    @property
+    def security(self) -> list:
+        return list(self._security)
 
 
 def default_as_none(value, default):
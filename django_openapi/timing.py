@@ -0,0 +1,104 @@
+"""请求各阶段耗时，OpenAPI(server_timing=True) 或设置 on_timing 时启用"""
+import asyncio
+import functools
+import threading
+import time
+import typing
+
+try:
+    import contextvars
+except ImportError:  # Python 3.6
+    contextvars = None  # type: ignore
+
+__all__ = ['Timing', 'PHASES']
+
+# 路径参数解析、权限检查、请求参数解析、处理函数、响应序列化、生成响应
+PHASES = ('path', 'permission', 'parameters', 'handler', 'serialize', 'respond')
+
+
+class _ThreadLocalVar(threading.local):
+    """Python 3.6 没有 contextvars，使用线程局部变量代替，同一线程中并发的异步请求会互相影响"""
+
+    value = None
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        token, self.value = self.value, value
+        return token
+
+    def reset(self, token):
+        self.value = token
+
+
+if contextvars is not None:
+    _current: 'contextvars.ContextVar[typing.Optional[Timing]]' = contextvars.ContextVar(
+        'django_openapi_timing', default=None)
+else:
+    _current = _ThreadLocalVar()  # type: ignore[assignment]
+
+
+class Timing:
+    """一次请求的耗时记录，单位为秒"""
+
+    __slots__ = ('path', 'method', 'phases', 'total', '_start')
+
+    def __init__(self, path: str, method: str):
+        self.path = path
+        self.method = method
+        self.phases: typing.Dict[str, float] = {}
+        self.total: typing.Optional[float] = None
+        self._start = time.perf_counter()
+
+    def add(self, phase: str, duration: float):
+        self.phases[phase] = self.phases.get(phase, 0) + duration
+
+    def finish(self) -> float:
+        self.total = total = time.perf_counter() - self._start
+        return total
+
+    def to_header(self) -> str:
+        """Server-Timing 头，单位为毫秒"""
+        items = ['%s;dur=%.3f' % (phase, duration * 1000) for phase, duration in self.phases.items()]
+        if self.total is not None:
+            items.append('total;dur=%.3f' % (self.total * 1000))
+        return ', '.join(items)
+
+    def __repr__(self):
+        return '<%s %s %s: %s>' % (self.__class__.__name__, self.method, self.path, self.to_header())
+
+
+def _record(phase, start):
+    timing = _current.get()
+    if timing is not None:
+        timing.add(phase, time.perf_counter() - start)
+
+
+def timed(phase: str, func: typing.Callable) -> typing.Callable:
+    """记录 func 的耗时到当前请求的 Timing 中，只在启用时使用"""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _record(phase, start)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(phase, start)
+    return wrapper
+
+
+def activate(timing: Timing):
+    return _current.set(timing)
+
+
+def deactivate(token):
+    _current.reset(token)
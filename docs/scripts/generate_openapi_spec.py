@@ -20,7 +20,6 @@ sys.path.extend([
 from django.conf import settings
 
 from django_openapi import OpenAPI, Resource
-from django_openapi.spec.utils import Collection
 
 settings.configure(
     INSTALLED_APPS=[
@@ -43,8 +42,6 @@ def main():
             continue
         module = import_module(pkg.__name__ + '.' + info.name)
 
-        Collection._instances.clear()  # 由于下面的openapi 实例的 id 一样，所以导致 Collection 对象共用了，这里清空一下
-
         openapi = OpenAPI()
         for obj in vars(module).values():
             if isinstance(obj, Resource):
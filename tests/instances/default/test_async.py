@@ -0,0 +1,116 @@
+"""异步处理函数"""
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+
+from django_openapi import Operation, Resource, permissions
+from django_openapi.exceptions import Forbidden
+from django_openapi.pagination import PageNumberPaginator
+from django_openapi.parameters import Query
+from django_openapi.schema import schemas
+from django_openapi.urls import reverse
+from tests.utils import TestResource, ResourceView
+
+UserSchema = schemas.Model.from_dict({'username': schemas.String()})
+
+
+class AsyncPermission(permissions.BasePermission):
+    async def check_permission(self, request):
+        await asyncio.sleep(0)
+        if request.GET.get('deny'):
+            raise Forbidden
+
+
+@TestResource
+class AsyncAPI(ResourceView):
+    @Operation(response_schema=schemas.Integer)
+    async def get(self, query=Query({'a': schemas.Integer()})):
+        await asyncio.sleep(0)
+        return query['a'] + 1
+
+    @Operation(response_schema=schemas.List(UserSchema))
+    def post(self):
+        return User.objects.order_by('username')
+
+
+@TestResource(permission=AsyncPermission)
+class AsyncPermissionAPI:
+    def get(self):
+        return 'ok'
+
+
+@TestResource
+class SyncAPI:
+    def get(self):
+        return 'ok'
+
+
+class HasUsers(permissions.BasePermission):
+    def check_permission(self, request):
+        if not User.objects.exists():
+            raise Forbidden
+
+
+@TestResource(permission=HasUsers)
+class SyncPermissionAPI:
+    async def get(self):
+        return 'ok'
+
+
+@TestResource
+class AsyncPaginationAPI:
+    async def get(self, paginator=PageNumberPaginator(UserSchema)):
+        return await sync_to_async(paginator.paginate)(User.objects.order_by('username'))
+
+
+def test_async_view():
+    assert asyncio.iscoroutinefunction(Resource.checkout(AsyncAPI).as_view())
+    assert asyncio.iscoroutinefunction(Resource.checkout(AsyncPermissionAPI).as_view())
+    assert not asyncio.iscoroutinefunction(Resource.checkout(SyncAPI).as_view())
+
+
+def test_async_handler(client):
+    response = client.get(reverse(AsyncAPI), data={'a': 1})
+    assert response.json() == 2
+    assert client.get(reverse(AsyncAPI)).status_code == 400
+    assert client.put(reverse(AsyncAPI)).status_code == 405
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sync_handler_in_async_resource(client):
+    User.objects.create(username='a')
+    assert client.post(reverse(AsyncAPI)).json() == [{'username': 'a'}]
+
+
+def test_async_permission(client):
+    assert client.get(reverse(AsyncPermissionAPI)).content == b'ok'
+    assert client.get(reverse(AsyncPermissionAPI), data={'deny': 1}).status_code == 403
+
+
+def test_run_in_event_loop():
+    view = Resource.checkout(AsyncAPI).as_view()
+    response = asyncio.run(view(RequestFactory().get('/', {'a': 2})))
+    assert response.content == b'3'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sync_permission_in_event_loop():
+    """同步权限检查在线程中执行，可以访问数据库"""
+    view = Resource.checkout(SyncPermissionAPI).as_view()
+    assert asyncio.run(view(RequestFactory().get('/'))).status_code == 403
+    User.objects.create(username='c')
+    assert asyncio.run(view(RequestFactory().get('/'))).content == b'ok'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_pagination_in_event_loop():
+    """paginate() 返回的是延迟查询的 QuerySet，序列化在线程中执行"""
+    User.objects.create(username='d')
+    view = Resource.checkout(AsyncPaginationAPI).as_view()
+    data = json.loads(asyncio.run(view(RequestFactory().get('/'))).content)
+    assert data['count'] == 1
+    assert data['results'] == [{'username': 'd'}]
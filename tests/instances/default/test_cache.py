@@ -0,0 +1,261 @@
+"""响应缓存"""
+import time
+
+import pytest
+from django.http import HttpResponse
+
+from django_openapi import Operation, model2schema
+from django_openapi.cache import LocalResponseCache, DjangoResponseCache, CachedResponse, invalidate
+from django_openapi.parameters import Query
+from django_openapi.pagination import PageNumberPaginator
+from django_openapi.schema import schemas
+from django_openapi.urls import reverse
+from tests.models import Author, Book, Tag
+from tests.utils import TestResource, ResourceView, itemgetter
+
+calls: list = []
+
+
+@TestResource('/cache/{id}', path_parameters={'id': schemas.Integer()})
+class CacheAPI(ResourceView):
+    @Operation(response_schema=schemas.Model.from_dict({'id': schemas.Integer(), 'q': schemas.String(nullable=True)}),
+               cache=LocalResponseCache(timeout=60, maxsize=2), cache_depends_on=[])
+    def get(self, query=Query({'q': schemas.String(required=False)})):
+        calls.append(self.pathargs['id'])
+        return {'id': self.pathargs['id'], 'q': query.get('q')}
+
+    @Operation(response_schema=schemas.Integer, cache=DjangoResponseCache(vary_on_user=True), cache_depends_on=[])
+    def post(self):
+        calls.append('post')
+        return len(calls)
+
+    @Operation(cache=60, cache_depends_on=[])
+    def put(self, paginator=PageNumberPaginator(schemas.Integer)):
+        calls.append('put')
+        return paginator.paginate(list(range(100)))
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+    cache.clear()
+    calls.clear()
+    for operation in CacheAPI.get.operation, CacheAPI.post.operation:
+        operation.cache.hits = operation.cache.misses = 0
+    CacheAPI.get.operation.cache.clear()
+
+
+def test_local_cache(client):
+    cache = CacheAPI.get.operation.cache
+    url = reverse(CacheAPI, kwargs={'id': 1})
+
+    response = client.get(url, data={'q': 'a'})
+    assert response.json() == {'id': 1, 'q': 'a'}
+    assert response['Cache-Control'] == 'max-age=60'
+    response = client.get(url, data={'q': 'a'})
+    assert response.json() == {'id': 1, 'q': 'a'}
+    assert response['Cache-Control'] == 'max-age=60'
+    assert calls == [1]
+    assert cache.stats == {'hits': 1, 'misses': 1}
+
+    # 参数不同
+    assert client.get(url, data={'q': 'b'}).json() == {'id': 1, 'q': 'b'}
+    assert client.get(reverse(CacheAPI, kwargs={'id': 2})).json() == {'id': 2, 'q': None}
+    assert calls == [1, 1, 2]
+
+    # LRU 淘汰
+    assert len(cache) == 2
+    client.get(url, data={'q': 'a'})
+    assert calls == [1, 1, 2, 1]
+
+
+def test_local_cache_expires():
+    cache = LocalResponseCache(timeout=0)
+    cache.set('a', CachedResponse(200, b'', 'application/json'))
+    time.sleep(0.001)
+    assert cache.get('a') is None
+
+
+@pytest.mark.django_db
+def test_vary_on_user(client, django_user_model):
+    url = reverse(CacheAPI, kwargs={'id': 1})
+    assert client.post(url).json() == 1
+    assert client.post(url).json() == 1
+    assert client.post(url)['Cache-Control'] == 'private, max-age=60'
+
+    client.force_login(django_user_model.objects.create(username='a'))
+    assert client.post(url).json() == 2
+    assert client.post(url).json() == 2
+
+
+def test_paginator_cache_key(client):
+    url = reverse(CacheAPI, kwargs={'id': 1})
+    assert client.put(url, QUERY_STRING='page=2').json()['results'][0] == 20
+    assert client.put(url, QUERY_STRING='page=3').json()['results'][0] == 40
+    assert client.put(url, QUERY_STRING='page=2').json()['results'][0] == 20
+    assert calls == ['put', 'put']
+
+
+def test_cache_spec(oas):
+    response = itemgetter(oas, ['paths', '/cache/{id}', 'get', 'responses', '200'])
+    assert response['headers'] == {'Cache-Control': {'schema': {'type': 'string', 'example': 'max-age=60'}}}
+
+
+class BookSchema(model2schema(Book, include_fields=['id', 'title'])):
+    tags = schemas.List(schemas.Model.from_dict({'name': schemas.String()}),
+                        serialize_preprocess=lambda manager: manager.all())
+
+
+@TestResource
+class BookAPI:
+    @Operation(response_schema=schemas.List(BookSchema), cache=60)
+    def get(self):
+        return Book.objects.order_by('pk')
+
+    @Operation(cache=60)
+    def post(self, paginator=PageNumberPaginator(Author)):
+        return paginator.paginate(Author.objects.order_by('pk'))
+
+    @Operation(response_schema=schemas.Integer, cache=60, cache_depends_on=['tests.Tag'])
+    def put(self):
+        return Tag.objects.count()
+
+
+def test_cache_dependencies():
+    assert BookAPI.get.operation.get_cache_dependencies() == {Book, Tag}
+    assert BookAPI.post.operation.get_cache_dependencies() == {Author}
+    assert BookAPI.put.operation.get_cache_dependencies() == {Tag}
+    assert CacheAPI.get.operation.get_cache_dependencies() == set()
+
+
+def test_partial_cache_dependencies():
+    """partial() 生成的类保留 model2schema 的 model"""
+    from django_openapi.cache import collect_models
+
+    schema = model2schema(Book).partial(include_fields=['id', 'title'])
+    assert collect_models(schema()) == {Book}
+
+
+def test_no_cache_dependencies_warning():
+    from django_openapi import OpenAPI, Resource
+
+    @Resource('/no-dependencies')
+    class API:
+        @Operation(response_schema=schemas.Integer, cache=60)
+        def get(self):
+            return 1
+
+    with pytest.warns(RuntimeWarning, match='cache_depends_on'):
+        OpenAPI().add_resource(API)
+
+
+@pytest.mark.django_db
+def test_signal_invalidation(client):
+    author = Author.objects.create(name='a')
+    book = Book.objects.create(title='b', author=author)
+    url = reverse(BookAPI)
+
+    assert client.get(url).json() == [{'id': book.id, 'title': 'b', 'tags': []}]
+    assert client.get(url).json() == [{'id': book.id, 'title': 'b', 'tags': []}]
+
+    # post_save
+    book.title = 'c'
+    book.save()
+    assert client.get(url).json()[0]['title'] == 'c'
+
+    # m2m_changed，由关联的 Tag 一侧修改
+    tag = Tag.objects.create(name='t')
+    tag.book_set.add(book)
+    assert client.get(url).json()[0]['tags'] == [{'name': 't'}]
+
+    # post_delete
+    book.delete()
+    assert client.get(url).json() == []
+
+    # QuerySet.update() 不发送信号，需要手动调用 invalidate
+    Book.objects.create(title='d', author=author)
+    assert client.get(url).json()[0]['title'] == 'd'
+    Book.objects.update(title='e')
+    assert client.get(url).json()[0]['title'] == 'd'
+    invalidate(Book)
+    assert client.get(url).json()[0]['title'] == 'e'
+
+    # 分页器
+    assert client.post(url).json()['count'] == 1
+    Author.objects.create(name='b')
+    assert client.post(url).json()['count'] == 2
+
+
+@TestResource
+class HeadersAPI:
+    @Operation(cache=60, cache_depends_on=[])
+    def get(self):
+        calls.append('headers')
+        response = HttpResponse(b'ok', content_type='text/plain')
+        response['X-Custom'] = 'a'
+        response['Vary'] = 'Accept-Language'
+        response.set_cookie('c', 'v', max_age=10, httponly=True)
+        return response
+
+
+def test_cached_headers(client):
+    """命中缓存时返回处理函数设置的头和 cookie"""
+    miss = client.get(reverse(HeadersAPI))
+    hit = client.get(reverse(HeadersAPI))
+    assert calls == ['headers']
+    for response in miss, hit:
+        assert response.content == b'ok'
+        assert response['Content-Type'] == 'text/plain'
+        assert response['X-Custom'] == 'a'
+        assert response['Vary'] == 'Accept-Language'
+        assert response['Cache-Control'] == 'max-age=60'
+    assert hit.cookies['c'].output() == miss.cookies['c'].output()
+    assert hit.cookies['c']['httponly'] and hit.cookies['c']['max-age'] == 10
+
+
+@pytest.mark.django_db
+def test_django_cache_versions():
+    cache = DjangoResponseCache()
+    versions = cache.get_versions(['tests.book', 'tests.tag'])
+    assert cache.get_versions(['tests.book', 'tests.tag']) == versions
+    cache.bump_version('tests.book')
+    assert cache.get_versions(['tests.book', 'tests.tag']) == [versions[0] + 1, versions[1]]
+
+
+def test_django_cache_without_async_api():
+    """Django 4.0 之前的缓存后端没有 aget、aset"""
+    import asyncio
+    from django.core.cache import caches
+
+    class SyncOnlyBackend:
+        def __init__(self, backend):
+            self.get = backend.get
+            self.set = backend.set
+
+    class SyncOnlyCache(DjangoResponseCache):
+        @property
+        def _cache(self):
+            return SyncOnlyBackend(caches[self.alias])
+
+    cache = SyncOnlyCache()
+    value = CachedResponse(200, b'1', 'application/json')
+    asyncio.run(cache.aset('key', value))
+    assert asyncio.run(cache.aget('key')) == value
+    assert DjangoResponseCache().get('key') == value
+
+
+@TestResource
+class AsyncVaryOnUserAPI:
+    @Operation(response_schema=schemas.Integer, cache=DjangoResponseCache(vary_on_user=True), cache_depends_on=[])
+    async def get(self):
+        return 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_vary_on_user(client, django_user_model):
+    """request.user 在线程中加载"""
+    user = django_user_model.objects.create(username='async')
+    client.force_login(user)
+    assert client.get(reverse(AsyncVaryOnUserAPI)).json() == 1
+    assert client.get(reverse(AsyncVaryOnUserAPI)).json() == 1
+    assert AsyncVaryOnUserAPI.get.operation.cache.stats == {'hits': 1, 'misses': 1}
@@ -1,3 +1,8 @@
+import pytest
+
+from django_openapi import Operation, Resource
+from django_openapi.parameters import Query
+from django_openapi.schema import schemas
 from django_openapi.urls import reverse
 from tests.utils import TestResource
 
@@ -14,3 +19,57 @@ def test_class_without_init_method(client):
     """
     resp = client.get(reverse(API))
     assert resp.status_code == 200
+
+
+@TestResource(stateless=True)
+class StatelessAPI:
+    instances = 0
+
+    def __init__(self):
+        StatelessAPI.instances += 1
+
+    def get(self):
+        return id(self)
+
+
+def test_stateless_resource(client):
+    """无状态资源的所有请求共用一个实例"""
+    resp1 = client.get(reverse(StatelessAPI))
+    resp2 = client.get(reverse(StatelessAPI))
+    assert resp1.content == resp2.content
+    assert StatelessAPI.instances == 1
+    assert client.post(reverse(StatelessAPI)).status_code == 405
+
+
+def test_stateless_resource_with_request_init():
+    with pytest.raises(ValueError, match='stateless'):
+        @Resource('/stateless', stateless=True)
+        class _API:
+            def __init__(self, request):
+                self.request = request
+
+
+class CustomOperation(Operation):
+    """重写 parse_request、wrapped_invoke 的子类"""
+
+    def parse_request(self, request):
+        kwargs = super().parse_request(request)
+        kwargs['query'] = dict(kwargs['query'], b=2)
+        return kwargs
+
+    def wrapped_invoke(self, handler, request):
+        rv, status_code = super().wrapped_invoke(handler, request)
+        return rv, 201
+
+
+@TestResource
+class CustomOperationAPI:
+    @CustomOperation(response_schema=schemas.Integer)
+    def get(self, query=Query({'a': schemas.Integer()})):
+        return query['a'] + query['b']
+
+
+def test_operation_subclass(client):
+    response = client.get(reverse(CustomOperationAPI), data={'a': 1})
+    assert response.status_code == 201
+    assert response.json() == 3
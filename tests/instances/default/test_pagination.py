@@ -1,8 +1,13 @@
 """分页器"""
+import datetime
+
+import pytest
+
 from django_openapi import Operation
 from django_openapi.schema import schemas
-from django_openapi.pagination import PageNumberPaginator
+from django_openapi.pagination import PageNumberPaginator, CursorPaginator
 from django_openapi.urls import reverse
+from tests.models import Author, Event
 from tests.utils import TestResource, ResourceView, itemgetter
 
 ALL_BOOKS = [dict(id=i, title='书名') for i in range(1, 150)]
@@ -87,3 +92,168 @@ def oas_response_properties_path(method):
         'paths', reverse(ResourceA), method, 'responses', '200', 'content', 'application/json',
         'schema', 'properties'
     ]
+
+
+class AuthorSchema(schemas.Model):
+    id = schemas.Integer()
+    name = schemas.String()  # type: ignore
+
+
+@TestResource
+class CursorResource(ResourceView):
+    @staticmethod
+    def get(paginator=CursorPaginator(AuthorSchema, ordering=['name'])):
+        return paginator.paginate(Author.objects.all())
+
+
+@pytest.mark.django_db
+def test_cursor_pagination(client, django_assert_num_queries):
+    # 存在重复的 name，依靠主键保证顺序稳定
+    Author.objects.bulk_create([Author(name='author%02d' % (i // 2)) for i in range(45)])
+    expected = list(Author.objects.order_by('name', 'pk').values_list('id', flat=True))
+
+    url = reverse(CursorResource)
+    ids = []
+    pages = []
+    params = {'page_size': 10}
+    while True:
+        with django_assert_num_queries(1):  # 没有 COUNT 查询
+            data = client.get(url, data=params).json()
+        pages.append(data)
+        ids.extend(item['id'] for item in data['results'])
+        if data['next'] is None:
+            break
+        params['cursor'] = data['next']
+    assert ids == expected
+    assert len(pages) == 5
+    assert pages[0]['previous'] is None
+
+    # 向前翻页
+    data = client.get(url, data={'page_size': 10, 'cursor': pages[-1]['previous']}).json()
+    assert data == pages[-2]
+    data = client.get(url, data={'page_size': 10, 'cursor': pages[1]['previous']}).json()
+    assert [item['id'] for item in data['results']] == expected[:10]
+    assert data['previous'] is None
+    assert data['next'] == pages[0]['next']
+
+
+@pytest.mark.django_db
+def test_cursor_invalid(client):
+    resp = client.get(reverse(CursorResource), data={'cursor': 'abc'})
+    assert resp.status_code == 400
+    assert resp.json() == {'errors': {'cursor': ['invalid cursor.']}}
+
+
+class EventSchema(schemas.Model):
+    id = schemas.Integer()
+    name = schemas.String()  # type: ignore
+
+
+@TestResource
+class EventCursorResource(ResourceView):
+    @staticmethod
+    def get(paginator=CursorPaginator(EventSchema, ordering=['-created'])):
+        return paginator.paginate(Event.objects.all())
+
+
+@pytest.mark.django_db
+def test_cursor_microseconds(client):
+    """只有微秒不同的时间不能因为游标精度丢失而被跳过"""
+    base = datetime.datetime(2024, 1, 1, 12)
+    Event.objects.bulk_create([
+        Event(name=str(i), created=base + datetime.timedelta(microseconds=123000 + i * 100)) for i in range(10)
+    ])
+    expected = list(Event.objects.order_by('-created', '-pk').values_list('id', flat=True))
+
+    ids = []
+    params = {'page_size': 3}
+    while True:
+        data = client.get(reverse(EventCursorResource), data=params).json()
+        ids.extend(item['id'] for item in data['results'])
+        if data['next'] is None:
+            break
+        params['cursor'] = data['next']
+    assert ids == expected
+
+
+def test_cursor_spec(oas):
+    parameters = itemgetter(oas, f'paths.{reverse(CursorResource)}.get.parameters')
+    assert [p['name'] for p in parameters] == ['cursor', 'page_size']
+    props = itemgetter(oas, [
+        'paths', reverse(CursorResource), 'get', 'responses', '200', 'content', 'application/json', 'schema',
+        'properties'
+    ])
+    assert set(props) == {'next', 'previous', 'results'}
+    assert props['next'] == {'type': 'string', 'nullable': True}
+
+
+class EstimatedPaginator(PageNumberPaginator):
+    count_strategy = 'estimated'
+
+    def estimate_count(self, queryset):
+        return 1000
+
+
+@TestResource
+class CountStrategyResource(ResourceView):
+    @staticmethod
+    def get(paginator=PageNumberPaginator(AuthorSchema, count_strategy='none')):
+        return paginator.paginate(Author.objects.order_by('pk'))
+
+    @staticmethod
+    def post(paginator=PageNumberPaginator(AuthorSchema, count_strategy='cached')):
+        return paginator.paginate(Author.objects.order_by('pk'))
+
+    @staticmethod
+    def put(paginator=EstimatedPaginator(AuthorSchema)):
+        return paginator.paginate(Author.objects.order_by('pk'))
+
+
+@pytest.mark.django_db
+def test_count_strategy_none(client, django_assert_num_queries):
+    Author.objects.bulk_create([Author(name=str(i)) for i in range(25)])
+    url = reverse(CountStrategyResource)
+    with django_assert_num_queries(1):
+        data = client.get(url, data={'page_size': 20}).json()
+    assert 'count' not in data
+    assert data['has_more'] is True
+    assert len(data['results']) == 20
+
+    data = client.get(url, data={'page_size': 20, 'page': 2}).json()
+    assert data['has_more'] is False
+    assert len(data['results']) == 5
+
+
+@pytest.mark.django_db
+def test_count_strategy_cached(client, django_assert_num_queries):
+    from django.core.cache import cache
+
+    cache.clear()
+    Author.objects.bulk_create([Author(name=str(i)) for i in range(25)])
+    url = reverse(CountStrategyResource)
+    with django_assert_num_queries(2):
+        assert client.post(url).json()['count'] == 25
+    Author.objects.create(name='new')
+    with django_assert_num_queries(1):
+        assert client.post(url).json()['count'] == 25  # 使用缓存的总数
+
+
+@pytest.mark.django_db
+def test_count_strategy_estimated(client):
+    assert client.put(reverse(CountStrategyResource)).json()['count'] == 1000
+
+
+def test_count_strategy_spec(oas):
+    def properties(method):
+        return itemgetter(oas, [
+            'paths', reverse(CountStrategyResource), method, 'responses', '200', 'content', 'application/json',
+            'schema', 'properties'
+        ])
+
+    assert set(properties('get')) == {'has_more', 'page', 'page_size', 'results'}
+    assert properties('get')['has_more'] == {'type': 'boolean'}
+    assert properties('post')['count'] == {'type': 'integer'}
+    assert properties('put')['count']['description'] == '估算的总数'
+
+    with pytest.raises(ValueError):
+        PageNumberPaginator(AuthorSchema, count_strategy='xxx')
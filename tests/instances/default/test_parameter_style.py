@@ -53,3 +53,32 @@ class PathSimpleFalse(ResourceView):
 def test_path_simple_false_array(client):
     assert client.get(f'{reverse(PathSimpleFalse, kwargs=dict(args="1,2,30"))}').json() == {'args': [1, 2, 30]}
     assert client.get(f'{reverse(PathSimpleFalse, kwargs=dict(args="1"))}').json() == {'args': [1]}
+
+
+def test_style_parser_does_not_copy():
+    """StyleParser.parse 不复制原数据，只读取 schema 定义的 key"""
+    from collections.abc import Mapping
+    from django_openapi.parameters.parameters import Header
+
+    class Headers(Mapping):
+        def __init__(self, data):
+            self.data = data
+            self.read = []
+
+        def __getitem__(self, key):
+            self.read.append(key)
+            return self.data[key]
+
+        def __contains__(self, key):
+            return key in self.data
+
+        def __iter__(self):
+            raise AssertionError('should not iterate')
+
+        def __len__(self):
+            return len(self.data)
+
+    header = Header({'x-a': schemas.Integer(), 'x-b': schemas.String(required=False)})
+    headers = Headers({'x-a': '1', **{'x-other-%s' % i: 'v' for i in range(40)}})
+    assert header.schema.deserialize(header.parser.parse(headers)) == {'x-a': 1}
+    assert headers.read == ['x-a']
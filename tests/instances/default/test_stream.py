@@ -0,0 +1,92 @@
+"""流式响应"""
+import json
+
+import django
+import pytest
+from django.contrib.auth.models import User
+
+from django_openapi import Operation, model2schema
+from django_openapi.schema import schemas
+from django_openapi.urls import reverse
+from tests.models import Author, Book, Tag
+from tests.utils import TestResource
+
+UserSchema = model2schema(User, include_fields=['id', 'username'])
+
+
+@TestResource
+class StreamAPI:
+    @Operation(response_schema=schemas.List(UserSchema), stream=True, stream_chunk_size=2)
+    def get(self):
+        return User.objects.order_by('id')
+
+    @Operation(response_schema=schemas.List(schemas.Integer), stream=True)
+    def post(self):
+        return (str(i) for i in range(3))
+
+
+@pytest.mark.django_db
+def test_stream_queryset(client):
+    for i in range(5):
+        User.objects.create(username='user%s' % i)
+
+    response = client.get(reverse(StreamAPI))
+    assert response.streaming
+    assert response['Content-Type'] == 'application/json'
+    chunks = list(response.streaming_content)
+    assert len(chunks) == 3
+    assert json.loads(b''.join(chunks)) == [
+        {'id': u.id, 'username': u.username} for u in User.objects.order_by('id')
+    ]
+
+
+@pytest.mark.django_db
+def test_stream_empty_queryset(client):
+    response = client.get(reverse(StreamAPI))
+    assert json.loads(b''.join(response.streaming_content)) == []
+
+
+def test_stream_iterable(client):
+    response = client.post(reverse(StreamAPI))
+    assert json.loads(b''.join(response.streaming_content)) == [0, 1, 2]
+
+
+def test_stream_requires_list():
+    with pytest.raises(ValueError):
+        Operation(response_schema=schemas.Integer, stream=True)
+
+
+def test_stream_async_handler():
+    """StreamingHttpResponse 在事件循环中迭代，异步处理函数返回的 QuerySet 无法查询"""
+    with pytest.raises(ValueError, match='async'):
+        @Operation(response_schema=schemas.List(UserSchema), stream=True)
+        async def get():
+            return User.objects.all()
+
+
+class BookSchema(model2schema(Book, include_fields=['id', 'title'])):
+    tags = schemas.List(model2schema(Tag, include_fields=['name']), serialize_preprocess=lambda m: m.all())
+
+
+@TestResource
+class StreamBookAPI:
+    @Operation(response_schema=schemas.List(BookSchema), stream=True, stream_chunk_size=2)
+    def get(self):
+        return Book.objects.order_by('id')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('iterator_prefetch', [True, False])
+def test_stream_prefetch(client, django_assert_num_queries, monkeypatch, iterator_prefetch):
+    """流式响应的嵌套列表按块预取，Django 4.1 之前的 iterator() 不支持 prefetch_related 时手动预取"""
+    from django_openapi.core import respond
+
+    monkeypatch.setattr(respond, '_ITERATOR_PREFETCH', iterator_prefetch and django.VERSION >= (4, 1))
+    author = Author.objects.create(name='a')
+    tag = Tag.objects.create(name='t')
+    for i in range(5):
+        Book.objects.create(title=str(i), author=author).tags.add(tag)
+
+    with django_assert_num_queries(4):  # 1 次查询 Book，每块 1 次查询 Tag，共 3 块
+        data = json.loads(b''.join(client.get(reverse(StreamBookAPI)).streaming_content))
+    assert data == [{'id': b.id, 'title': b.title, 'tags': [{'name': 't'}]} for b in Book.objects.order_by('id')]
@@ -1 +1,36 @@
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
+
+
+class Author(models.Model):
+    name = models.CharField(max_length=50)
+    biography = models.TextField(blank=True)
+
+
+class AuthorProfile(models.Model):
+    author = models.OneToOneField(Author, on_delete=models.CASCADE, related_name='profile')
+    website = models.URLField(blank=True)
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=50)
+
+
+class Book(models.Model):
+    title = models.CharField(max_length=50)
+    content = models.TextField(blank=True)
+    author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name='books')
+    tags = models.ManyToManyField(Tag)
+
+
+class Comment(models.Model):
+    content = models.CharField(max_length=50)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    target = GenericForeignKey('content_type', 'object_id')
+
+
+class Event(models.Model):
+    name = models.CharField(max_length=50)
+    created = models.DateTimeField()
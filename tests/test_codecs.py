@@ -0,0 +1,72 @@
+"""JSON 编解码器"""
+import datetime
+import uuid
+from decimal import Decimal
+
+import pytest
+from django.urls import path, include
+
+from django_openapi import OpenAPI, Resource, Operation
+from django_openapi.codecs import JSONCodec, OrjsonCodec, BaseJSONCodec
+from django_openapi.parameters import Body
+from django_openapi.schema import schemas
+
+orjson = pytest.importorskip('orjson')
+
+
+class CountingCodec(OrjsonCodec):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def loads(self, data: bytes):
+        self.calls.append('loads')
+        return super().loads(data)
+
+    def dumps(self, obj) -> bytes:
+        self.calls.append('dumps')
+        return super().dumps(obj)
+
+
+codec = CountingCodec()
+openapi = OpenAPI(codec=codec)
+
+
+@Resource('/')
+class API:
+    @Operation(response_schema=schemas.List(schemas.Any))
+    def post(self, body=Body({'a': schemas.Integer()})):
+        return [body, Decimal('1.10'), datetime.date(2022, 1, 1), uuid.UUID(int=1)]
+
+
+openapi.add_resource(API)
+
+urlpatterns = [
+    path('', include(openapi.urls))
+]
+
+
+@pytest.mark.urls('tests.test_codecs')
+def test_openapi_codec(client):
+    codec.calls.clear()
+    response = client.post('/', data={'a': '1'}, content_type='application/json')
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/json'
+    assert response.json() == [{'a': 1}, '1.10', '2022-01-01', '00000000-0000-0000-0000-000000000001']
+    assert codec.calls == ['loads', 'dumps']
+
+    response = client.post('/', data='{', content_type='application/json')
+    assert response.status_code == 400
+
+    response = client.post('/', data={'a': 'x'}, content_type='application/json')
+    assert response.json() == {'errors': {'a': ['不是一个整数']}}
+
+
+@pytest.mark.parametrize('codec_cls', [JSONCodec, OrjsonCodec])
+def test_codecs(codec_cls):
+    c: BaseJSONCodec = codec_cls()
+    assert c.loads(c.dumps({'a': [1, None, True, 'b']})) == {'a': [1, None, True, 'b']}
+    assert c.loads(c.dumps({1: Decimal('1.5')})) == {'1': '1.5'}
+
+    with pytest.raises(ValueError):
+        c.loads(b'{')
@@ -6,3 +6,28 @@ def test_openapi_id():
     openapi3 = OpenAPI()
     assert openapi1.id == openapi2.id
     assert openapi1.id != openapi3.id
+
+
+def test_openapi_explicit_id():
+    openapi = OpenAPI(id='public')
+    assert openapi.id == 'public'
+    assert openapi.urls[0].pattern.match('apispec_public')
+
+
+def test_path_parameters_spec_is_lazy(monkeypatch):
+    from django_openapi import Resource
+    from django_openapi.schema import schemas
+
+    calls = []
+    monkeypatch.setattr(schemas.Integer, 'to_spec', lambda self, *args, **kwargs: calls.append(self) or {})
+
+    @Resource('/items/{id}', path_parameters={'id': schemas.Integer()})
+    class API:
+        def get(self):
+            pass
+
+    resource = Resource.checkout(API)
+    assert resource.django_path == '/items/<id>'
+    assert calls == []
+    assert [p['name'] for p in resource.path_parameters_spec] == ['id']
+    assert len(calls) == 1
@@ -0,0 +1,47 @@
+"""导入耗时，管理命令、serverless 等短生命周期的进程只导入用到的部分"""
+import subprocess
+import sys
+
+import pytest
+
+
+def imported_modules(statement):
+    """python -X importtime 输出的模块"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            capture_output=True, text=True, check=True)
+    return {line.rsplit('|', 1)[1].strip() for line in result.stderr.splitlines() if line.startswith('import time:')}
+
+
+def test_import_package():
+    modules = imported_modules('import django_openapi')
+    assert 'django_openapi' in modules
+    for name in ['django_openapi.core', 'django_openapi.pagination', 'dateutil']:
+        assert name not in modules
+
+
+def test_model2schema_submodule():
+    """先导入同名的子模块，django_openapi.model2schema 仍然是函数"""
+    subprocess.run([sys.executable, '-c', 'import django_openapi.model2schema, django_openapi; '
+                                          'assert callable(django_openapi.model2schema)'], check=True)
+
+
+@pytest.mark.parametrize('statement', [
+    'from django_openapi.schema import schemas',
+    'from django_openapi.parameters import Query',
+])
+def test_dateutil_is_lazy(statement):
+    modules = imported_modules(statement)
+    assert 'django_openapi.schema.schemas.types' in modules
+    assert 'dateutil' not in modules
+
+
+def test_lazy_exports():
+    import django_openapi
+    from django_openapi.core import OpenAPI
+    from django_openapi.model2schema import model2schema
+
+    assert django_openapi.OpenAPI is OpenAPI
+    assert django_openapi.model2schema is model2schema
+    assert 'Respond' in dir(django_openapi)
+    with pytest.raises(AttributeError):
+        django_openapi.xxx  # noqa
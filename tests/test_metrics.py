@@ -0,0 +1,107 @@
+"""请求统计"""
+import gc
+import threading
+
+import pytest
+from django.urls import path, include
+
+from django_openapi import OpenAPI, Resource, Operation
+from django_openapi.metrics import MetricsRegistry
+from django_openapi.parameters import Query
+from django_openapi.schema import schemas
+
+openapi = OpenAPI(metrics=MetricsRegistry(buckets=[0.1, 1]))
+
+
+@Resource('/items/{id}')
+class API:
+    @Operation(response_schema=schemas.Integer)
+    def get(self, query=Query({'a': schemas.Integer()})):
+        return query['a']
+
+    def post(self):
+        raise ValueError
+
+
+openapi.add_resource(API)
+
+urlpatterns = [
+    path('', include(openapi.urls)),
+]
+
+pytestmark = pytest.mark.urls('tests.test_metrics')
+
+METRICS_URL = '/metrics_%s' % openapi.id[:8]
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    openapi.metrics.reset()
+
+
+def test_metrics(client):
+    client.get('/items/1', data={'a': 1})
+    client.get('/items/1', data={'a': 1})
+    client.get('/items/1')  # 400
+    client.put('/items/1')  # 405
+    client.generic('FOO', '/items/1')
+
+    data = openapi.metrics.collect()
+    assert data[('/items/{id}', 'GET')]['statuses'] == {200: 2, 400: 1}
+    assert data[('/items/{id}', 'GET')]['count'] == 3
+    assert data[('/items/{id}', 'other')]['statuses'] == {405: 2}  # 未定义的方法
+
+    response = client.get(METRICS_URL)
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    text = response.content.decode()
+    assert 'django_openapi_requests_total{path="/items/{id}",method="GET",status="200"} 2' in text
+    assert 'django_openapi_errors_total{path="/items/{id}",method="GET",status="400"} 1' in text
+    assert 'django_openapi_errors_total{path="/items/{id}",method="GET",status="200"}' not in text
+    assert 'django_openapi_request_duration_seconds_bucket{path="/items/{id}",method="GET",le="+Inf"} 3' in text
+    assert 'django_openapi_request_duration_seconds_count{path="/items/{id}",method="GET"} 3' in text
+    assert '# TYPE django_openapi_request_duration_seconds histogram' in text
+
+
+def test_unhandled_exception(client):
+    client.raise_request_exception = False
+    assert client.post('/items/1').status_code == 500
+    assert openapi.metrics.collect()[('/items/{id}', 'POST')]['statuses'] == {500: 1}
+
+
+def test_threads():
+    registry = MetricsRegistry(buckets=[0.1, 1])
+
+    def worker():
+        for i in range(1000):
+            registry.observe('/a', 'GET', 200, i / 1000)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+
+    item = registry.collect()[('/a', 'GET')]
+    assert item['count'] == 8000
+    assert item['statuses'] == {200: 8000}
+    assert item['buckets'] == [8 * 101, 8 * 899, 0]
+
+
+def test_finished_threads_merged():
+    """线程结束后分片合并到 _base，分片数量不会随线程数增加"""
+    registry = MetricsRegistry(buckets=[1])
+
+    for _ in range(10):
+        thread = threading.Thread(target=registry.observe, args=('/a', 'GET', 200, 0.5))
+        thread.start()
+        thread.join()
+    gc.collect()
+
+    assert registry._shards == []
+    assert registry.collect()[('/a', 'GET')]['count'] == 10
+    registry.reset()
+    assert registry.collect() == {}
+
+
+def test_label_escape():
+    registry = MetricsRegistry()
+    registry.observe('/a"\\\n', 'GET', 200, 0)
+    assert r'path="/a\"\\\n"' in registry.to_prometheus()
@@ -219,3 +219,75 @@ def test_serialize_empty_field():
         b = schemas.String(fallback=lambda _: schemas.EMPTY)
 
     assert Schema().serialize({'a': 1}) == {'a': 1}
+
+
+def test_compiled_serialize():
+    """Meta.compiled 序列化结果与非编译模式一致"""
+
+    class Child(schemas.Model):
+        x = schemas.Integer()
+
+    class Schema(schemas.Model):
+        a = schemas.Integer(alias='k', attr='a')
+        b = schemas.String(fallback=lambda _: schemas.EMPTY)
+        c = schemas.Password()
+        d = schemas.Date(nullable=True)
+        e = schemas.String(serialize_preprocess=lambda v: v.upper())
+        f = schemas.List(Child)
+        g = Child(nullable=True)
+
+    class CompiledSchema(Schema):
+        class Meta:
+            compiled = True
+
+    class Obj:
+        a = 1
+        c = 'secret'
+        d = None
+        e = 'e'
+        f = [{'x': '1'}, {'x': 2}]
+        g = None
+
+    for obj in [Obj(), vars(Obj)]:
+        assert CompiledSchema().serialize(obj) == Schema().serialize(obj) == {
+            'k': 1, 'd': None, 'e': 'E', 'f': [{'x': 1}, {'x': 2}], 'g': None,
+        }
+    assert '_compiled_serializer' in CompiledSchema.__dict__
+    assert '_compiled_serializer' not in Schema.__dict__
+
+    # 子类会生成自己的序列化函数
+    class SubCompiledSchema(CompiledSchema):
+        h = schemas.Integer()
+
+    assert SubCompiledSchema().serialize({'a': 1, 'd': None, 'e': 'e', 'f': [], 'g': None, 'h': '2'}) == {
+        'k': 1, 'd': None, 'e': 'E', 'f': [], 'g': None, 'h': 2,
+    }
+
+    with pytest.raises(ValueError, match="^CompiledSchema field 'd' serialization error"):
+        CompiledSchema().serialize({'a': 1, 'd': 'x', 'e': 'e', 'f': [], 'g': None})
+    with pytest.raises(KeyError):
+        CompiledSchema().serialize({})
+
+
+def test_deserialize_plan():
+    class Schema(schemas.Model):
+        id = schemas.Integer(read_only=True)
+        a = schemas.Integer(alias='k', attr='a')
+        b = schemas.List(schemas.Integer, default=list)
+
+    schema = Schema(unknown_fields='include')
+    obj = {'id': 1, 'k': '1', 'c': 'c'}
+    assert schema.deserialize(obj) == {'a': 1, 'b': [], 'id': 1, 'c': 'c'}
+    assert obj == {'id': 1, 'k': '1', 'c': 'c'}  # 不修改原数据
+    assert schema._deserialize_plan is schema._deserialize_plan
+
+    with pytest.raises(ValidationError):
+        try:
+            Schema(unknown_fields='error').deserialize({'id': 1, 'b': ['x']})
+        except ValidationError as e:
+            assert e.format_errors() == {
+                'k': ['这个字段是必需的'],
+                'b': {0: ['不是一个整数']},
+                'id': ['unknown field.'],
+            }
+            raise
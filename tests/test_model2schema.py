@@ -25,6 +25,22 @@ def test_to_schema():
     assert schema_cls.fields.id.read_only is True  # pk 不可写
 
 
+def test_cache():
+    assert model2schema(User) is model2schema(User)
+    assert model2schema(User, include_fields=['id']) is model2schema(User, include_fields=('id',))
+    assert model2schema(User, include_fields=['id']) is not model2schema(User)
+
+    extra_kwargs = {'username': {'description': 'name'}}
+    schema = model2schema(User, extra_kwargs=extra_kwargs)
+    assert schema is model2schema(User, extra_kwargs={'username': {'description': 'name'}})
+    assert extra_kwargs == {'username': {'description': 'name'}}  # 不修改传入的参数
+    assert schema.fields.username.description == 'name'
+
+    # 不可哈希的参数每次生成新的类
+    extra_kwargs = {'username': {'choices': ['a']}}
+    assert model2schema(User, extra_kwargs=extra_kwargs) is not model2schema(User, extra_kwargs=extra_kwargs)
+
+
 def test_char_field():
     class Char(models.Model):
         char = models.CharField(max_length=3)
@@ -0,0 +1,98 @@
+"""openapi_build 命令"""
+import gzip
+import json
+import os
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.urls import path, include
+
+from django_openapi import OpenAPI, Resource, Operation
+from django_openapi.schema import schemas
+
+openapi = OpenAPI(title='中文')
+
+
+@Resource('/a')
+class API:
+    @Operation(response_schema=schemas.String())
+    def get(self):
+        pass
+
+
+openapi.add_resource(API)
+
+urlpatterns = [
+    path('', include(openapi.urls)),
+    path('prefix/', include(openapi.urls)),
+]
+
+pytestmark = pytest.mark.urls('tests.test_openapi_build')
+
+
+def spec_url(prefix=''):
+    return '/%sapispec_%s' % (prefix, openapi.id[:8])
+
+
+def test_openapi_build(tmp_path, client):
+    call_command('openapi_build', str(tmp_path), urlconf='tests.test_openapi_build')
+    assert sorted(os.listdir(tmp_path)) == sorted([
+        openapi.get_spec_artifact_name(''),
+        openapi.get_spec_artifact_name('') + '.gz',
+        openapi.get_spec_artifact_name('/prefix'),
+        openapi.get_spec_artifact_name('/prefix') + '.gz',
+    ])
+
+    with open(tmp_path / openapi.get_spec_artifact_name('/prefix'), 'rb') as fp:
+        content = fp.read()
+    spec = json.loads(content)
+    assert spec['servers'] == [{'url': '/prefix'}]
+    assert spec['info']['title'] == '中文'
+    assert b' ' not in content  # 压缩输出
+
+    # 从构建的文件读取文档，不再生成
+    openapi._spec_dir = str(tmp_path)
+    openapi.invalidate_spec()
+    try:
+        with mock.patch.object(openapi, 'get_spec') as get_spec:
+            response = client.get(spec_url('prefix/'))
+            assert response.content == content
+            response = client.get(spec_url('prefix/'), HTTP_ACCEPT_ENCODING='gzip')
+            assert response['Content-Encoding'] == 'gzip'
+            assert gzip.decompress(response.content) == content
+            assert get_spec.call_count == 0
+    finally:
+        openapi._spec_dir = None
+        openapi.invalidate_spec()
+
+
+def test_missing_artifact(tmp_path, client):
+    call_command('openapi_build', str(tmp_path), '--no-gzip', urlconf='tests.test_openapi_build')
+    assert len(os.listdir(tmp_path)) == 2
+
+    os.remove(tmp_path / openapi.get_spec_artifact_name(''))
+    openapi._spec_dir = str(tmp_path)
+    openapi.invalidate_spec()
+    try:
+        # 文件不存在时运行时生成
+        assert client.get(spec_url()).json()['paths'].keys() == {'/a'}
+        # 没有 gzip 文件时不压缩
+        assert not client.get(spec_url('prefix/'), HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding')
+    finally:
+        openapi._spec_dir = None
+        openapi.invalidate_spec()
+
+
+def test_empty_artifact(tmp_path, client):
+    """空文件（例如写入中断）或无法读取的文件与文件不存在一样，运行时生成"""
+    (tmp_path / openapi.get_spec_artifact_name('')).write_bytes(b'')
+    (tmp_path / openapi.get_spec_artifact_name('/prefix')).mkdir()
+    openapi._spec_dir = str(tmp_path)
+    openapi.invalidate_spec()
+    try:
+        assert client.get(spec_url()).json()['paths'].keys() == {'/a'}
+        assert client.get(spec_url('prefix/')).json()['servers'] == [{'url': '/prefix'}]
+    finally:
+        openapi._spec_dir = None
+        openapi.invalidate_spec()
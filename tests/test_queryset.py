@@ -0,0 +1,206 @@
+"""根据响应 schema 优化 QuerySet"""
+import pytest
+from django.contrib.auth.models import User, Permission
+from django.db.models import F
+from django.urls import path, include
+
+from django_openapi import OpenAPI, Resource, Operation, model2schema
+from django_openapi.pagination import PageNumberPaginator
+from django_openapi.queryset import project, optimize, explain
+from django_openapi.schema import schemas
+from tests.models import Author, AuthorProfile, Book, Comment, Tag
+
+UserSchema = model2schema(User, include_fields=['id', 'username', 'password'],
+                          extra_kwargs={'password': {'write_only': True}})
+
+
+def loaded_fields(queryset):
+    return {f.attname for f in queryset.model._meta.concrete_fields} - queryset[0].get_deferred_fields()
+
+
+@pytest.fixture
+def users(db):
+    return [User.objects.create(username='user%s' % i, email='%s@example.com' % i) for i in range(3)]
+
+
+def test_project(users):
+    queryset = project(User.objects.all(), UserSchema())
+    assert loaded_fields(queryset) == {'id', 'username'}  # 不查询 write_only 字段
+
+    # Model.partial
+    queryset = project(User.objects.all(), UserSchema.partial(include_fields=['username'])())
+    assert loaded_fields(queryset) == {'id', 'username'}
+
+    # ForeignKey
+    queryset = project(Permission.objects.all(), model2schema(Permission, include_fields=['content_type_id'])())
+    assert loaded_fields(queryset) == {'id', 'content_type_id'}
+
+
+def test_not_project(users):
+    queryset = User.objects.all()
+
+    # 已经指定查询字段
+    assert project(queryset.defer('email'), UserSchema()).query.deferred_loading == (frozenset({'email'}), True)
+
+    # values()
+    assert project(queryset.values(), UserSchema()).query.deferred_loading == (frozenset(), True)
+
+    # 非 model 字段
+    schema = schemas.Model.from_dict({'username': schemas.String(), 'full_name': schemas.String(attr='get_full_name')})
+    assert project(queryset, schema()) is queryset
+
+    # 注解字段
+    schema = schemas.Model.from_dict({'name': schemas.String()})
+    assert loaded_fields(project(queryset.annotate(name=F('username')), schema())) == {'id'}
+
+
+class TagSchema(schemas.Model):
+    name = schemas.String()  # type: ignore
+
+
+class AuthorSchema(schemas.Model):
+    name = schemas.String()  # type: ignore
+    profile = schemas.Model.from_dict({'website': schemas.String()})(nullable=True)
+
+
+class BookSchema(schemas.Model):
+    title = schemas.String()
+    author = AuthorSchema()
+    tags = schemas.List(TagSchema, serialize_preprocess=lambda manager: manager.all())
+
+
+class AuthorWithBooksSchema(schemas.Model):
+    name = schemas.String()  # type: ignore
+    books = schemas.List(BookSchema, serialize_preprocess=lambda manager: manager.all())
+
+
+def test_explain():
+    assert explain(BookSchema(), Book) == {
+        'only': ['id', 'title', 'author__id', 'author__name', 'author__profile__id', 'author__profile__website'],
+        'select_related': ['author', 'author__profile'],
+        'prefetch_related': ['tags'],
+    }
+    assert explain(AuthorWithBooksSchema(), Author) == {
+        'only': ['id', 'name'],
+        'select_related': [],
+        'prefetch_related': ['books', 'books__author', 'books__author__profile', 'books__tags'],
+    }
+
+
+@pytest.fixture
+def books(db):
+    tags = [Tag.objects.create(name='tag%s' % i) for i in range(2)]
+    rv = []
+    for i in range(3):
+        author = Author.objects.create(name='author%s' % i, biography='...')
+        AuthorProfile.objects.create(author=author, website='https://example.com')
+        book = Book.objects.create(title='book%s' % i, content='...', author=author)
+        book.tags.set(tags)
+        rv.append(book)
+    return rv
+
+
+def test_optimize(books, django_assert_num_queries):
+    expected = BookSchema().serialize(books[0])
+
+    with django_assert_num_queries(2) as ctx:
+        data = schemas.List(BookSchema).serialize(optimize(Book.objects.order_by('id'), BookSchema()))
+    assert data[0] == expected
+    assert 'biography' not in ctx.captured_queries[0]['sql']
+
+    with django_assert_num_queries(4):
+        data = schemas.List(AuthorWithBooksSchema).serialize(
+            optimize(Author.objects.order_by('id'), AuthorWithBooksSchema()))
+    assert data[0] == {'name': 'author0', 'books': [expected]}
+
+
+def test_optimize_existing_lookups(books, django_assert_num_queries):
+    from django.db.models import Prefetch
+
+    # 已有的 select_related 不使用 .only()
+    queryset = optimize(Book.objects.select_related('author'), BookSchema())
+    assert queryset.query.deferred_loading == (frozenset(), True)
+
+    # 已有的 Prefetch 不重复添加
+    queryset = optimize(Book.objects.prefetch_related(Prefetch('tags', Tag.objects.all())), BookSchema())
+    with django_assert_num_queries(2):
+        list(queryset)
+
+
+def test_optimize_deferred(books, django_assert_num_queries):
+    """已有的 .only()、.defer() 不做处理，select_related 会和延迟加载的关系冲突"""
+    for queryset in Book.objects.only('title'), Book.objects.defer('author'):
+        optimized = optimize(queryset.order_by('id'), BookSchema())
+        assert optimized.query.select_related is False
+        assert optimized.query.deferred_loading == queryset.query.deferred_loading
+        assert schemas.List(BookSchema).serialize(optimized)[0] == BookSchema().serialize(books[0])
+
+
+class CommentSchema(schemas.Model):
+    content = schemas.String()
+    target = schemas.Model.from_dict({'title': schemas.String()})()
+
+
+def test_generic_foreign_key(books, django_assert_num_queries):
+    """GenericForeignKey 没有确定的关联 model，不做处理"""
+    Comment.objects.create(content='a', target=books[0])
+    assert explain(CommentSchema(), Comment)['select_related'] == []
+
+    queryset = optimize(Comment.objects.all(), CommentSchema())
+    assert queryset.query.deferred_loading == (frozenset(), True)
+    with django_assert_num_queries(2):  # 查询 Comment 和 Book，ContentType 有缓存
+        assert schemas.List(CommentSchema).serialize(queryset) == [{'content': 'a', 'target': {'title': 'book0'}}]
+
+    # 非嵌套的 GenericForeignKey 也需要 content_type_id、object_id，不使用 .only()
+    schema = schemas.Model.from_dict({'target': schemas.String()})
+    assert optimize(Comment.objects.all(), schema()).query.deferred_loading == (frozenset(), True)
+
+
+@Resource('/users')
+class UsersAPI:
+    @Operation(response_schema=schemas.List(UserSchema))
+    def get(self):
+        return User.objects.order_by('id')
+
+    def post(self, paginator=PageNumberPaginator(UserSchema)):
+        result = paginator.paginate(User.objects.order_by('id'))
+        assert loaded_fields(result['results']) == {'id', 'username'}
+        return result
+
+    @Operation(response_schema=schemas.List(UserSchema), optimize_queryset=False)
+    def put(self):
+        return User.objects.order_by('id')
+
+
+@Resource('/books')
+class BooksAPI:
+    def get(self, paginator=PageNumberPaginator(BookSchema)):
+        return paginator.paginate(Book.objects.defer('author').order_by('id'))
+
+
+openapi = OpenAPI()
+openapi.add_resource(UsersAPI)
+openapi.add_resource(BooksAPI)
+
+urlpatterns = [
+    path('', include(openapi.urls))
+]
+
+
+@pytest.mark.urls('tests.test_queryset')
+def test_operation_project(client, users, django_assert_num_queries):
+    expected = [{'id': u.id, 'username': u.username} for u in users]
+    with django_assert_num_queries(1) as ctx:
+        assert client.get('/users').json() == expected
+    assert '"auth_user"."email"' not in ctx.captured_queries[0]['sql']
+
+    assert client.post('/users').json()['results'] == expected
+
+    with django_assert_num_queries(1) as ctx:
+        assert client.put('/users').json() == expected
+    assert '"auth_user"."email"' in ctx.captured_queries[0]['sql']
+
+
+@pytest.mark.urls('tests.test_queryset')
+def test_paginate_deferred(client, books):
+    assert client.get('/books').json()['results'][0] == BookSchema().serialize(books[0])
@@ -254,3 +254,20 @@ def test_model_from_dict_meta():
     new_schema = Schema.from_dict({})
     assert new_schema._metadata['schema_name'] is None
     assert new_schema._metadata['unknown_fields'] == 'include'
+
+
+def test_model_from_dict_cache():
+    class Schema(schemas.Model):
+        a = schemas.Integer()
+        b = schemas.String()
+
+    field = schemas.Integer()
+    assert schemas.Model.from_dict({'x': field}) is schemas.Model.from_dict({'x': field})
+    assert schemas.Model.from_dict({'x': field}) is not schemas.Model.from_dict({'x': schemas.Integer()})
+    assert schemas.Model.from_dict({'x': field}) is not schemas.Model.from_dict({'x': field}, meta={'compiled': True})
+    assert Schema.partial(include_fields=['a']) is Schema.partial(include_fields=('a',))
+    assert Schema.partial(include_fields=['a']) is not Schema.partial(exclude_fields=['a'])
+
+    # 不可哈希的 meta 每次生成新的类
+    meta = {'default_validators': []}
+    assert schemas.Model.from_dict({'x': field}, meta=meta) is not schemas.Model.from_dict({'x': field}, meta=meta)
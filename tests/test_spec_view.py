@@ -0,0 +1,144 @@
+"""文档缓存"""
+import gzip
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+from django.test import RequestFactory
+from django.urls import path, include
+
+from django_openapi import OpenAPI, Resource, Operation, permissions
+from django_openapi.schema import schemas
+from django_openapi.spec import Tag
+
+openapi = OpenAPI(spec_gzip=True, security_schemes={'basic': {'type': 'http', 'scheme': 'basic'}})
+
+
+class ItemSchema(schemas.Model):
+    name = schemas.String()  # type: ignore
+
+
+@Resource('/a', tags=[Tag('a', description='tag a')], permission=permissions.IsAuthenticated)
+class API:
+    @Operation(response_schema=schemas.List(ItemSchema))
+    def get(self):
+        pass
+
+
+openapi.add_resource(API)
+openapi.register_schema(ItemSchema)
+
+urlpatterns = [
+    path('', include(openapi.urls)),
+    path('prefix/', include(openapi.urls)),
+    path('<str:tenant>/', include(openapi.urls)),
+]
+
+pytestmark = pytest.mark.urls('tests.test_spec_view')
+
+
+def spec_url(prefix=''):
+    return '/%sapispec_%s' % (prefix, openapi.id[:8])
+
+
+def test_spec_cache(client):
+    openapi.invalidate_spec()
+    with mock.patch.object(openapi, 'get_spec', wraps=openapi.get_spec) as get_spec:
+        response1 = client.get(spec_url())
+        response2 = client.get(spec_url())
+        assert get_spec.call_count == 1
+        assert response1.content == response2.content
+
+        # 不同的服务器前缀分别缓存
+        response3 = client.get(spec_url('prefix/'))
+        assert get_spec.call_count == 2
+        assert response3.json()['servers'] == [{'url': '/prefix'}]
+
+        openapi.invalidate_spec()
+        client.get(spec_url())
+        assert get_spec.call_count == 3
+
+
+def test_dynamic_prefix_not_cached(client):
+    """路径参数的每个值都是不同的前缀，不缓存，避免缓存无限增长"""
+    openapi.invalidate_spec()
+    for tenant in 'abc':
+        assert client.get(spec_url('%s/' % tenant)).json()['servers'] == [{'url': '/%s' % tenant}]
+    assert openapi._encoded_specs == {}
+
+    client.get(spec_url('prefix/'))
+    assert list(openapi._encoded_specs) == ['/prefix']
+
+
+def test_spec_etag(client):
+    response = client.get(spec_url())
+    etag = response['ETag']
+    assert etag.startswith('"')
+
+    response = client.get(spec_url(), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+
+    response = client.get(spec_url(), HTTP_IF_NONE_MATCH='"other"')
+    assert response.status_code == 200
+
+
+def test_spec_gzip(client):
+    response = client.get(spec_url(), HTTP_ACCEPT_ENCODING='gzip, deflate')
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['Vary'] == 'Accept-Encoding'
+    assert json.loads(gzip.decompress(response.content)) == client.get(spec_url()).json()
+
+
+def test_spec_gzip_etag(client):
+    """gzip 和未压缩的内容使用不同的 ETag，所有响应都带有 Vary"""
+    identity = client.get(spec_url())
+    compressed = client.get(spec_url(), HTTP_ACCEPT_ENCODING='gzip')
+    assert identity['Vary'] == 'Accept-Encoding'
+    assert compressed['ETag'] == identity['ETag'][:-1] + '-gzip"'
+
+    response = client.get(spec_url(), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=compressed['ETag'])
+    assert response.status_code == 304
+    assert response['ETag'] == compressed['ETag']
+    assert response['Vary'] == 'Accept-Encoding'
+    # 未压缩内容的 ETag 不能用于 gzip 响应
+    assert client.get(spec_url(), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=identity['ETag']).status_code == 200
+
+
+@pytest.mark.parametrize('accept_encoding, expected', [
+    ('gzip;q=0', False),
+    ('gzip; q=0.0, deflate', False),
+    ('deflate, gzip;q=0.5', True),
+    ('*', True),
+    ('*, gzip;q=0', False),
+    ('identity', False),
+])
+def test_spec_gzip_qvalue(client, accept_encoding, expected):
+    response = client.get(spec_url(), HTTP_ACCEPT_ENCODING=accept_encoding)
+    assert response.has_header('Content-Encoding') is expected
+
+
+def test_concurrent_spec():
+    """多线程同时生成文档"""
+    expected = openapi.get_spec()
+    assert len(expected['components']['schemas']) == 2
+    assert expected['tags'] == [{'name': 'a', 'description': 'tag a'}]
+    assert expected['paths']['/a']['get']['security'] == [{'basic': []}]
+    assert openapi.get_spec() == expected  # 重复生成结果一致
+
+    def build(_):
+        return openapi.get_spec()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert all(spec == expected for spec in executor.map(build, range(200)))
+
+    rf = RequestFactory()
+
+    def request(i):
+        if i % 10 == 0:
+            openapi.invalidate_spec()
+        return openapi.spec_view(rf.get(spec_url())).content
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert len(set(executor.map(request, range(200)))) == 1
@@ -0,0 +1,103 @@
+"""请求各阶段耗时"""
+import asyncio
+
+import pytest
+from django.urls import path, include
+
+from django_openapi import OpenAPI, Resource, Operation, permissions
+from django_openapi.parameters import Query
+from django_openapi.schema import schemas
+from django_openapi.timing import PHASES
+
+records: list = []
+
+openapi = OpenAPI(server_timing=True, on_timing=lambda request, response, timing: records.append(timing))
+
+
+class AllowAll(permissions.BasePermission):
+    def check_permission(self, request):
+        pass
+
+
+@Resource('/items/{id}', path_parameters={'id': schemas.Integer()}, permission=AllowAll)
+class API:
+    @Operation(response_schema=schemas.Model.from_dict({'id': schemas.Integer()}))
+    def get(self, query=Query({'id': schemas.Integer()})):
+        return query
+
+    @Operation(response_schema=schemas.Integer)
+    async def post(self):
+        await asyncio.sleep(0)
+        return 1
+
+
+@Resource('/async')
+class AsyncAPI:
+    @Operation(response_schema=schemas.Integer)
+    async def get(self):
+        return 1
+
+
+openapi.add_resource(API)
+openapi.add_resource(AsyncAPI)
+
+plain = OpenAPI()
+
+
+@Resource('/a')
+class PlainAPI:
+    def get(self):
+        return 'ok'
+
+
+plain.add_resource(PlainAPI)
+
+urlpatterns = [
+    path('', include(openapi.urls)),
+    path('plain/', include(plain.urls)),
+]
+
+pytestmark = pytest.mark.urls('tests.test_timing')
+
+
+@pytest.fixture(autouse=True)
+def clear_records():
+    records.clear()
+
+
+def test_server_timing(client):
+    response = client.get('/items/1', data={'id': 2})
+    assert response.json() == {'id': 2}
+
+    header = response['Server-Timing']
+    names = [item.split(';')[0] for item in header.split(', ')]
+    assert names == ['path', 'permission', 'parameters', 'handler', 'serialize', 'respond', 'total']
+    assert set(names) == {*PHASES, 'total'}
+
+    (timing,) = records
+    assert timing.path == '/items/{id}'
+    assert timing.method == 'GET'
+    assert timing.total >= sum(timing.phases.values())
+
+
+def test_error_timing(client):
+    response = client.get('/items/1')
+    assert response.status_code == 400
+    assert 'handler' not in records[0].phases
+    assert 'respond' in records[0].phases
+    assert response.has_header('Server-Timing')
+
+
+def test_async_timing(client):
+    response = client.post('/items/1')
+    assert response.json() == 1
+    assert set(records[0].phases) == {'path', 'permission', 'handler', 'serialize', 'respond'}
+
+    assert client.get('/async').has_header('Server-Timing')
+
+
+def test_disabled(client):
+    assert not plain.instrumented
+    assert client.get('/plain/a').content == b'ok'
+    assert not client.get('/plain/a').has_header('Server-Timing')
+    assert records == []
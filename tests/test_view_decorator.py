@@ -4,6 +4,7 @@ import typing
 
 import pytest
 from django.http import HttpRequest, HttpResponse
+from django.test import RequestFactory
 from django.urls import path, include
 
 from django_openapi import OpenAPI, Resource, Operation
@@ -46,6 +47,39 @@ class API:
 
 openapi.add_resource(API)
 
+calls: list = []
+
+
+def counting_decorator(name):
+    def decorator(func):
+        calls.append(('decorate', name))
+
+        @functools.wraps(func)
+        def wrapper(request, *args, **kwargs):
+            calls.append(('call', name))
+            return func(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@Resource('/', view_decorators=[counting_decorator('resource')])
+class API2:
+    @Operation(view_decorators=[counting_decorator('get')])
+    def get(self):
+        pass
+
+    @Operation(view_decorators=[counting_decorator('post')])
+    def post(self):
+        pass
+
+    def put(self):
+        pass
+
+
+openapi.add_resource(API2)
+
 
 @view_decorator(['GET', 'POST'])
 def view(request, *args, **kwargs):
@@ -54,7 +88,7 @@ def view(request, *args, **kwargs):
 
 urlpatterns = [
     path('a/', view),
-    path('b/', include(openapi.urls))
+    path('b/', include(openapi.urls)),
 ]
 
 
@@ -70,3 +104,20 @@ def test_b(client):
     assert client.get('/b/').status_code == 200
     assert client.post('/b/').status_code == 200
     assert client.put('/b/').status_code == 488
+
+
+def test_pre_applied_decorators():
+    """装饰器在 as_view() 时套用一次，请求只经过对应方法的装饰器"""
+    assert sorted(calls) == [('decorate', 'get'), ('decorate', 'post'), ('decorate', 'resource')]
+    calls.clear()
+
+    view = Resource.checkout(API2).as_view()
+    rf = RequestFactory()
+    assert view(rf.get('/')).status_code == 200
+    assert view(rf.get('/')).status_code == 200
+    assert calls == [('call', 'get'), ('call', 'resource')] * 2  # Operation 的装饰器在外层
+    calls.clear()
+
+    assert view(rf.put('/')).status_code == 200
+    assert view(rf.delete('/')).status_code == 405
+    assert calls == [('call', 'resource')] * 2
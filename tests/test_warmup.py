@@ -0,0 +1,109 @@
+"""OpenAPI.warmup() 之后请求时不再有延迟初始化"""
+import gc
+
+import pytest
+from django.urls import path, include
+from django.utils.functional import cached_property, SimpleLazyObject
+
+from django_openapi import OpenAPI, Resource, Operation, permissions
+from django_openapi.pagination import PageNumberPaginator
+from django_openapi.parameters import Query, Body
+from django_openapi.schema import schemas
+
+
+class Node(schemas.Model):
+    id = schemas.Integer()
+    children = schemas.List(schemas.Ref('Node'), required=False)
+
+    class Meta:
+        compiled = True
+
+
+class AllowAll(permissions.BasePermission):
+    def check_permission(self, request):
+        pass
+
+
+@Resource('/nodes/{id}', path_parameters={'id': schemas.Integer()}, permission=AllowAll)
+class NodeAPI:
+    @Operation(response_schema=Node, permission=AllowAll)
+    def get(self, query=Query({'depth': schemas.Integer(default=1)})):
+        return {'id': 1, 'children': [{'id': 2, 'children': []}]}
+
+    @Operation(response_schema=Node)
+    def post(self, body=Body(Node)):
+        return body
+
+
+@Resource('/pages')
+class PageAPI:
+    @staticmethod
+    def get(paginator=PageNumberPaginator(Node)):
+        return paginator.paginate([{'id': i, 'children': []} for i in range(5)])
+
+
+openapi = OpenAPI()
+openapi.add_resource(NodeAPI)
+openapi.add_resource(PageAPI)
+
+urlpatterns = [path('api/', include(openapi.urls))]
+
+pytestmark = pytest.mark.urls('tests.test_warmup')
+
+
+@pytest.fixture
+def lazy_calls(monkeypatch):
+    """记录 django_openapi 中 cached_property、SimpleLazyObject 的初始化和文档生成"""
+    calls = []
+
+    original_get = cached_property.__get__
+    original_setup = SimpleLazyObject._setup
+    original_encode_spec = OpenAPI.encode_spec
+
+    def get(self, instance, cls=None):
+        if instance is not None and self.func.__module__.startswith('django_openapi'):
+            calls.append(self.name)
+        return original_get(self, instance, cls)
+
+    def setup(self):
+        if self._setupfunc.__module__.startswith('django_openapi'):
+            calls.append('SimpleLazyObject')
+        return original_setup(self)
+
+    def encode_spec(self, *args, **kwargs):
+        calls.append('encode_spec')
+        return original_encode_spec(self, *args, **kwargs)
+
+    monkeypatch.setattr(cached_property, '__get__', get)
+    monkeypatch.setattr(SimpleLazyObject, '_setup', setup)
+    monkeypatch.setattr(OpenAPI, 'encode_spec', encode_spec)
+    return calls
+
+
+def test_no_lazy_initialization_after_warmup(client, lazy_calls):
+    openapi.warmup()
+    assert 'encode_spec' in lazy_calls
+    assert '_compiled_serializer' in Node.__dict__
+    lazy_calls.clear()
+
+    resp = client.get('/api/nodes/1')
+    assert resp.json() == {'id': 1, 'children': [{'id': 2, 'children': []}]}
+    resp = client.post('/api/nodes/1', data={'id': 1, 'children': [{'id': 2, 'children': []}]}, content_type='application/json')
+    assert resp.status_code == 200
+    assert client.get('/api/pages').json()['count'] == 5
+    assert client.get('/api/apispec_%s' % openapi.id[:8]).status_code == 200
+
+    assert lazy_calls == []
+
+
+def test_warmup_freeze(monkeypatch):
+    frozen = []
+    monkeypatch.setattr(gc, 'freeze', lambda: frozen.append(True))
+    openapi.warmup(spec=False, freeze=True)
+    assert frozen == [True]
+
+
+def test_warmup_freeze_unsupported(monkeypatch):
+    """Python 3.6 没有 gc.freeze()"""
+    monkeypatch.delattr(gc, 'freeze')
+    openapi.warmup(spec=False, freeze=True)